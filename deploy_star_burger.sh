@@ -4,6 +4,8 @@ set -e
 
 project_directory="/home/admin/star-burger"
 gunicorn="star-burger-gunicorn.service"
+gunicorn_async="star-burger-gunicorn-async.service"
+geocoder="star-burger-geocoder.service"
 
 cd $project_directory
 
@@ -19,9 +21,12 @@ npm ci --dev
 
 python manage.py collectstatic --noinput
 python manage.py migrate --noinput
+python manage.py refresh_order_candidates
 
 sudo systemctl reload nginx
 sudo systemctl restart $gunicorn
+sudo systemctl restart $gunicorn_async
+sudo systemctl restart $geocoder
 
 echo "Deploy successful!"
 
@@ -1,4 +1,5 @@
 from django.contrib import admin
+from django.db import transaction
 from django.http.response import HttpResponseRedirect
 from django.shortcuts import reverse
 from django.templatetags.static import static
@@ -6,6 +7,7 @@ from django.utils.html import format_html
 from django.utils.http import url_has_allowed_host_and_scheme
 
 from django.conf import settings
+from star_burger.paginator import EstimatedCountPaginator
 from .models import Product
 from .models import ProductCategory
 from .models import Restaurant
@@ -17,11 +19,27 @@ from .models import Order
 class RestaurantMenuItemInline(admin.TabularInline):
     model = RestaurantMenuItem
     extra = 0
+    autocomplete_fields = [
+        'restaurant',
+        'product',
+    ]
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'restaurant',
+            'product',
+        )
 
 
 class ProductInOrderInLine(admin.TabularInline):
     model = ProductInOrder
     extra = 0
+    autocomplete_fields = [
+        'product',
+    ]
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('product')
 
 
 @admin.register(Restaurant)
@@ -36,6 +54,9 @@ class RestaurantAdmin(admin.ModelAdmin):
         'address',
         'contact_phone',
     ]
+    readonly_fields = [
+        'place',
+    ]
     inlines = [
         RestaurantMenuItemInline
     ]
@@ -55,6 +76,9 @@ class ProductAdmin(admin.ModelAdmin):
     list_filter = [
         'category',
     ]
+    list_select_related = [
+        'category',
+    ]
     search_fields = [
         # FIXME SQLite can not convert letter case for cyrillic words properly, so search will be buggy.
         # Migration to PostgreSQL is necessary
@@ -121,13 +145,28 @@ class OrderAdmin(admin.ModelAdmin):
         'firstname',
         'lastname',
         'phonenumber',
+        'total_price',
         'comment'
     ]
-    readonly_fields = ['order_time']
+    search_fields = [
+        '=id',
+        'firstname',
+        'lastname',
+        'phonenumber',
+        'address',
+    ]
+    readonly_fields = ['order_time', 'total_price', 'place']
+    autocomplete_fields = ['restaurant']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     inlines = [
         ProductInOrderInLine
     ]
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        Order.objects.filter(pk=form.instance.pk).update_total_price()
+
     def response_post_save_change(self, request, obj):
         res = super().response_post_save_change(request, obj)
         url = request.GET.get('next')
@@ -153,3 +192,31 @@ class ProductInOrderAdmin(admin.ModelAdmin):
         'product',
         'quantity',
     ]
+    list_select_related = [
+        'order',
+        'product',
+    ]
+    autocomplete_fields = [
+        'order',
+        'product',
+    ]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        Order.objects.filter(
+            pk__in=[obj.order_id, form.initial.get('order')]
+        ).update_total_price()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        Order.objects.filter(pk=obj.order_id).update_total_price()
+
+    def delete_queryset(self, request, queryset):
+        # Действие удаления, в отличие от форм админки, не открывает
+        # транзакцию
+        with transaction.atomic():
+            orders_ids = list(queryset.values_list('order', flat=True))
+            super().delete_queryset(request, queryset)
+            Order.objects.filter(pk__in=orders_ids).update_total_price()
@@ -0,0 +1,17 @@
+from django.db import connection
+from django.db.models import Max
+
+
+def bulk_create_and_fetch(model, objects, batch_size=5000):
+    """Создает объекты одним bulk_create и возвращает их с заполненными pk.
+
+    Если база не умеет возвращать pk из bulk_create, как SQLite в Django 3.2,
+    созданные объекты перечитываются по pk больше последнего существующего,
+    поэтому параллельно в ту же таблицу никто писать не должен.
+    """
+    if connection.features.can_return_rows_from_bulk_insert:
+        return model.objects.bulk_create(objects, batch_size=batch_size)
+
+    last_pk = model.objects.aggregate(last_pk=Max('pk'))['last_pk'] or 0
+    model.objects.bulk_create(objects, batch_size=batch_size)
+    return list(model.objects.filter(pk__gt=last_pk).order_by('pk'))
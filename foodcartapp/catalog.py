@@ -0,0 +1,139 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+from star_burger.metrics import CACHE_REQUESTS
+
+from .models import Product, RestaurantMenuItem
+from .renderers import compress_content, encode_json
+
+
+PRODUCT_LIST_CACHE_KEY = 'foodcartapp:product_list'
+PRODUCT_PRICES_CACHE_KEY = 'foodcartapp:product_prices'
+AVAILABILITY_MATRIX_CACHE_KEY = 'foodcartapp:availability_matrix'
+
+
+def dump_products():
+    products = Product.objects.select_related('category').available()
+
+    dumped_products = []
+    for product in products:
+        dumped_product = {
+            'id': product.id,
+            'name': product.name,
+            'price': product.price,
+            'special_status': product.special_status,
+            'description': product.description,
+            'category': {
+                'id': product.category.id,
+                'name': product.category.name,
+            } if product.category else None,
+            'image': product.image.url,
+            'restaurant': {
+                'id': product.id,
+                'name': product.name,
+            }
+        }
+        dumped_products.append(dumped_product)
+    return dumped_products
+
+
+def get_product_list_content():
+    cached_product_list = cache.get(PRODUCT_LIST_CACHE_KEY)
+    CACHE_REQUESTS.labels(
+        'product_list',
+        'miss' if cached_product_list is None else 'hit',
+    ).inc()
+    if cached_product_list is None:
+        content = encode_json(dump_products())
+        etag = hashlib.sha256(content).hexdigest()
+        cached_product_list = content, compress_content(content), f'"{etag}"'
+        cache.set(
+            PRODUCT_LIST_CACHE_KEY,
+            cached_product_list,
+            timeout=settings.PRODUCT_LIST_CACHE_TIMEOUT,
+        )
+    return cached_product_list
+
+
+def get_available_product_prices():
+    product_prices = cache.get(PRODUCT_PRICES_CACHE_KEY)
+    CACHE_REQUESTS.labels(
+        'product_prices',
+        'miss' if product_prices is None else 'hit',
+    ).inc()
+    if product_prices is None:
+        product_prices = dict(
+            Product.objects.available().values_list('pk', 'price'))
+        cache.set(
+            PRODUCT_PRICES_CACHE_KEY,
+            product_prices,
+            timeout=settings.PRODUCT_LIST_CACHE_TIMEOUT,
+        )
+    return product_prices
+
+
+def invalidate_product_list():
+    cache.delete_many([PRODUCT_LIST_CACHE_KEY, PRODUCT_PRICES_CACHE_KEY])
+
+
+class AvailabilityMatrix:
+    """Наличие товаров в ресторанах.
+
+    Ячейки лежат одним bytearray по строке на товар. Товары и рестораны
+    без пунктов меню в матрицу не попадают и считаются недоступными.
+    """
+
+    def __init__(self, menu_items):
+        self.rows = {}
+        self.columns = {}
+        cells = []
+        for product_id, restaurant_id, availability in menu_items:
+            self.rows.setdefault(product_id, len(self.rows))
+            self.columns.setdefault(restaurant_id, len(self.columns))
+            cells.append((
+                self.rows[product_id],
+                self.columns[restaurant_id],
+                availability,
+            ))
+
+        self.cells = bytearray(len(self.rows) * len(self.columns))
+        for row, column, availability in cells:
+            self.cells[row * len(self.columns) + column] = availability
+
+    def get_availability(self, product_id, restaurants_ids):
+        row = self.rows.get(product_id)
+        if row is None:
+            return [False] * len(restaurants_ids)
+
+        offset = row * len(self.columns)
+        return [
+            restaurant_id in self.columns
+            and bool(self.cells[offset + self.columns[restaurant_id]])
+            for restaurant_id in restaurants_ids
+        ]
+
+
+def get_availability_matrix():
+    matrix = cache.get(AVAILABILITY_MATRIX_CACHE_KEY)
+    CACHE_REQUESTS.labels(
+        'availability_matrix',
+        'miss' if matrix is None else 'hit',
+    ).inc()
+    if matrix is None:
+        matrix = AvailabilityMatrix(
+            RestaurantMenuItem.objects
+            .values_list('product_id', 'restaurant_id', 'availability')
+            .iterator()
+        )
+        cache.set(
+            AVAILABILITY_MATRIX_CACHE_KEY,
+            matrix,
+            timeout=settings.PRODUCT_LIST_CACHE_TIMEOUT,
+        )
+    return matrix
+
+
+def invalidate_availability_matrix():
+    cache.delete(AVAILABILITY_MATRIX_CACHE_KEY)
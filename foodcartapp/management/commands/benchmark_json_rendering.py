@@ -0,0 +1,77 @@
+import json
+import timeit
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+
+from foodcartapp.renderers import compress_content, encode_json
+
+
+def make_products(products_count):
+    return [
+        {
+            'id': product_id,
+            'name': f'Бургер №{product_id}',
+            'price': Decimal('349.00') + product_id,
+            'special_status': product_id % 10 == 0,
+            'description': 'Сочная котлета из говядины, сыр чеддер, '
+                           'маринованные огурцы и фирменный соус.',
+            'category': {
+                'id': product_id % 7,
+                'name': 'Бургеры',
+            },
+            'image': f'/media/burger_{product_id}.jpg',
+            'restaurant': {
+                'id': product_id,
+                'name': f'Бургер №{product_id}',
+            },
+        }
+        for product_id in range(1, products_count + 1)
+    ]
+
+
+def encode_json_as_before(data):
+    return json.dumps(
+        data,
+        cls=DjangoJSONEncoder,
+        ensure_ascii=False,
+        indent=4,
+    ).encode()
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает размер и скорость сериализации каталога товаров'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def measure(self, encode, data, repeat):
+        seconds = min(timeit.repeat(lambda: encode(data), number=1,
+                                    repeat=repeat))
+        return seconds * 1000
+
+    def handle(self, *args, **options):
+        products = make_products(options['products'])
+        repeat = options['repeat']
+
+        before = encode_json_as_before(products)
+        after = encode_json(products)
+        compressed_after = compress_content(after)
+
+        self.stdout.write(f'Товаров в каталоге: {len(products)}')
+        self.stdout.write(
+            f'indent=4, DjangoJSONEncoder: {len(before)} байт, '
+            f'{self.measure(encode_json_as_before, products, repeat):.2f} мс'
+        )
+        self.stdout.write(
+            f'компактный encode_json: {len(after)} байт, '
+            f'{self.measure(encode_json, products, repeat):.2f} мс'
+        )
+        for encoding, content in compressed_after.items():
+            self.stdout.write(f'компактный + {encoding}: {len(content)} байт')
+        self.stdout.write(
+            f'сжатие всех вариантов: '
+            f'{self.measure(compress_content, after, repeat):.2f} мс'
+        )
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from foodcartapp.models import Order, ProductInOrder
+
+
+class Command(BaseCommand):
+    help = 'Проверяет, что сохраненная стоимость заказов совпадает с суммой их позиций'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Пересчитать стоимость заказов с расхождениями',
+        )
+
+    def handle(self, *args, **options):
+        order_items_price = (
+            ProductInOrder.objects
+                .filter(order=OuterRef('pk'))
+                .values('order')
+                .annotate(total_price=Sum('products_price'))
+                .values('total_price')
+        )
+        inconsistent_orders = (
+            Order.objects
+                .annotate(order_items_price=Coalesce(
+                    Subquery(order_items_price),
+                    Value(0),
+                    output_field=DecimalField(),
+                ))
+                .exclude(total_price=F('order_items_price'))
+        )
+
+        orders_ids = []
+        for order in inconsistent_orders.only('pk', 'total_price'):
+            orders_ids.append(order.pk)
+            self.stdout.write(
+                f'Заказ {order.pk}: сохранено {order.total_price}, '
+                f'по позициям {order.order_items_price}'
+            )
+
+        if not orders_ids:
+            self.stdout.write('Расхождений не найдено')
+            return
+        if options['fix']:
+            Order.objects.filter(pk__in=orders_ids).update_total_price()
+            self.stdout.write(f'Пересчитано заказов: {len(orders_ids)}')
+        else:
+            self.stderr.write(f'Заказов с расхождениями: {len(orders_ids)}')
+            raise SystemExit(1)
@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from foodcartapp.models import OrderIdempotencyKey
+
+
+class Command(BaseCommand):
+    help = 'Удаляет просроченные ключи идемпотентности заказов'
+
+    def handle(self, *args, **options):
+        deleted_count, _ = OrderIdempotencyKey.objects.filter(
+            created_at__lt=timezone.now() - settings.ORDER_IDEMPOTENCY_KEY_TTL,
+        ).delete()
+        self.stdout.write(f'Удалено ключей: {deleted_count}')
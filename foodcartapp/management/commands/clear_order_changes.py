@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from foodcartapp.models import OrderChange
+
+
+class Command(BaseCommand):
+    help = 'Удаляет старые записи журнала изменений заказов'
+
+    def handle(self, *args, **options):
+        deleted_count, _ = OrderChange.objects.filter(
+            created_at__lt=timezone.now() - settings.ORDER_CHANGES_TTL,
+        ).delete()
+        self.stdout.write(f'Удалено записей: {deleted_count}')
@@ -0,0 +1,82 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from foodcartapp.order_transfer import FORMATS, CSVOrderWriter
+from foodcartapp.order_transfer import JSONLinesOrderWriter, iterate_orders
+
+
+class Command(BaseCommand):
+    help = 'Выгружает заказы вместе с позициями в файл JSONL или CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'output',
+            help='Путь к файлу или - для вывода в консоль',
+        )
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            help='Формат файла. По умолчанию определяется по расширению',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Сколько строк читать из базы за раз',
+        )
+        parser.add_argument(
+            '--after-id',
+            type=int,
+            default=0,
+            help='Продолжить выгрузку с заказа, следующего за этим id. '
+                 'Заказы дописываются в конец файла',
+        )
+        parser.add_argument(
+            '--progress-every',
+            type=int,
+            default=10000,
+            help='Как часто сообщать о прогрессе, в заказах',
+        )
+
+    def handle(self, *args, **options):
+        output_format = options['format'] or (
+            'csv' if options['output'].endswith('.csv') else 'jsonl')
+        is_resumed = options['after_id'] > 0
+
+        if options['output'] == '-':
+            output = sys.stdout
+        else:
+            output = open(
+                options['output'],
+                'a' if is_resumed else 'w',
+                encoding='utf-8',
+                newline='',
+            )
+
+        try:
+            if output_format == 'csv':
+                writer = CSVOrderWriter(output, write_header=not is_resumed)
+            else:
+                writer = JSONLinesOrderWriter(output)
+
+            exported_count = 0
+            last_order_id = options['after_id']
+            for order in iterate_orders(
+                    options['after_id'], options['chunk_size']):
+                writer.write(order)
+                exported_count += 1
+                last_order_id = order['id']
+                if exported_count % options['progress_every'] == 0:
+                    self.report_progress(exported_count, last_order_id)
+        finally:
+            if output is not sys.stdout:
+                output.close()
+
+        self.report_progress(exported_count, last_order_id)
+
+    def report_progress(self, exported_count, last_order_id):
+        self.stderr.write(
+            f'Выгружено заказов: {exported_count}, '
+            f'последний id: {last_order_id}'
+        )
@@ -0,0 +1,214 @@
+import random
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from foodcartapp.bulk import bulk_create_and_fetch
+from foodcartapp.catalog import invalidate_availability_matrix
+from foodcartapp.catalog import invalidate_product_list
+from foodcartapp.models import Order, ProductInOrder, Product, ProductCategory
+from foodcartapp.models import Restaurant, RestaurantMenuItem
+from foodcartapp.restaurant_index import reset_restaurant_index
+from foodcartapp.revisions import get_current_revision
+from places.addresses import normalize_address
+from places.models import Place
+
+
+CITY_CENTER = (55.751244, 37.618423)
+CITY_RADIUS_DEGREES = 0.25
+STREETS = [
+    'Тверская', 'Арбат', 'Ленинский проспект', 'Профсоюзная', 'Мясницкая',
+    'Покровка', 'Большая Якиманка', 'Новослободская', 'Сретенка', 'Лесная',
+    'Садовая-Кудринская', 'Пятницкая', 'Остоженка', 'Маросейка', 'Полянка',
+]
+CATEGORIES = ['Бургеры', 'Напитки', 'Закуски', 'Десерты', 'Салаты']
+BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = 'Наполняет базу синтетическими ресторанами, меню и заказами'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--restaurants', type=int, default=10)
+        parser.add_argument('--products', type=int, default=100)
+        parser.add_argument(
+            '--menu-density',
+            type=float,
+            default=0.7,
+            help='Доля товаров, которые есть в меню каждого ресторана',
+        )
+        parser.add_argument(
+            '--completed-orders',
+            type=int,
+            default=1000,
+            help='Сколько выполненных заказов создать',
+        )
+        parser.add_argument(
+            '--pending-orders',
+            type=int,
+            default=100,
+            help='Сколько необработанных заказов создать',
+        )
+        parser.add_argument(
+            '--max-order-lines',
+            type=int,
+            default=6,
+            help='Максимальное число позиций в заказе',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Удалить существующие заказы, меню, товары и рестораны',
+        )
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        if options['clear']:
+            Order.objects.all().delete()
+            RestaurantMenuItem.objects.all().delete()
+            Product.objects.all().delete()
+            ProductCategory.objects.all().delete()
+            Restaurant.objects.all().delete()
+        self.taken_addresses = set(
+            Place.objects.values_list('address', flat=True))
+
+        restaurants = self.create_restaurants(options['restaurants'])
+        products = self.create_products(options['products'])
+        self.create_menu(restaurants, products, options['menu_density'])
+        orders = self.create_orders(
+            list(Product.objects.filter(pk__gte=products[0].pk).available())
+            if products else [],
+            options['completed_orders'],
+            options['pending_orders'],
+            options['max_order_lines'],
+        )
+
+        reset_restaurant_index()
+        Order.objects.filter(
+            pk__in=[order.pk for order in orders if order.status == 'new_order'],
+        ).refresh_restaurant_candidates()
+        invalidate_product_list()
+        invalidate_availability_matrix()
+
+        self.stdout.write(
+            f'Создано ресторанов: {len(restaurants)}, '
+            f'товаров: {len(products)}, заказов: {len(orders)}'
+        )
+
+    def make_address(self):
+        while True:
+            address = (
+                f'Москва, ул. {self.rng.choice(STREETS)}, '
+                f'д. {self.rng.randint(1, 300)}, '
+                f'кв. {self.rng.randint(1, 900)}'
+            )
+            if address not in self.taken_addresses:
+                self.taken_addresses.add(address)
+                return address
+
+    def create_places(self, count):
+        addresses = [self.make_address() for _ in range(count)]
+        return bulk_create_and_fetch(Place, [
+            Place(
+                address=address,
+                normalized_address=normalize_address(address),
+                lat=CITY_CENTER[0]
+                + self.rng.uniform(-1, 1) * CITY_RADIUS_DEGREES,
+                lon=CITY_CENTER[1]
+                + self.rng.uniform(-1, 1) * CITY_RADIUS_DEGREES * 1.7,
+                status='found',
+            )
+            for address in addresses
+        ])
+
+    def create_restaurants(self, count):
+        return bulk_create_and_fetch(Restaurant, [
+            Restaurant(
+                name=f'Star Burger {place.pk}',
+                address=place.address,
+                place=place,
+                contact_phone='+74950000000',
+            )
+            for place in self.create_places(count)
+        ])
+
+    def create_products(self, count):
+        categories = bulk_create_and_fetch(ProductCategory, [
+            ProductCategory(name=name) for name in CATEGORIES
+        ])
+        return bulk_create_and_fetch(Product, [
+            Product(
+                name=f'Блюдо №{product_number}',
+                category=self.rng.choice(categories),
+                price=self.rng.randint(90, 330),
+                image='synthetic.jpg',
+                special_status=self.rng.random() < 0.1,
+                description='Синтетический товар для нагрузочных тестов',
+            )
+            for product_number in range(1, count + 1)
+        ])
+
+    def create_menu(self, restaurants, products, menu_density):
+        RestaurantMenuItem.objects.bulk_create([
+            RestaurantMenuItem(
+                restaurant=restaurant,
+                product=product,
+                availability=self.rng.random() < 0.9,
+            )
+            for restaurant in restaurants
+            for product in products
+            if self.rng.random() < menu_density
+        ], batch_size=BATCH_SIZE)
+
+    def create_orders(self, products, completed_count, pending_count,
+                      max_order_lines):
+        if not products:
+            return []
+
+        statuses = (
+            ['completed_order'] * completed_count
+            + ['new_order'] * pending_count
+        )
+        now = timezone.now()
+        revision = get_current_revision()
+        orders = []
+        orders_lines = []
+        for place, status in zip(self.create_places(len(statuses)), statuses):
+            lines_count = self.rng.randint(
+                1, min(max_order_lines, len(products)))
+            lines = []
+            for product in self.rng.sample(products, lines_count):
+                quantity = self.rng.randint(1, 3)
+                lines.append(ProductInOrder(
+                    product=product,
+                    quantity=quantity,
+                    products_price=product.price * quantity,
+                ))
+            orders.append(Order(
+                firstname='Покупатель',
+                lastname=f'№{place.pk}',
+                phonenumber=f'+7916{self.rng.randint(0, 9999999):07d}',
+                address=place.address,
+                place=place,
+                status=status,
+                payment_form=self.rng.choice(['cash', 'card', 'site']),
+                order_time=now - timedelta(
+                    minutes=self.rng.randint(0, 60 * 24 * 90)),
+                total_price=sum(line.products_price for line in lines),
+                revision=revision,
+            ))
+            orders_lines.append(lines)
+
+        orders = bulk_create_and_fetch(Order, orders)
+        for order, lines in zip(orders, orders_lines):
+            for line in lines:
+                line.order = order
+        ProductInOrder.objects.bulk_create(
+            [line for lines in orders_lines for line in lines],
+            batch_size=BATCH_SIZE,
+        )
+        return orders
@@ -0,0 +1,65 @@
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+
+from foodcartapp.order_transfer import FORMATS, get_import_context
+from foodcartapp.order_transfer import import_orders_batch
+from foodcartapp.order_transfer import read_csv_orders, read_jsonl_orders
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает заказы с позициями из файла JSONL или CSV, '
+        'выгруженного командой export_orders'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='Путь к файлу')
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            help='Формат файла. По умолчанию определяется по расширению',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько заказов сохранять в одной транзакции',
+        )
+        parser.add_argument(
+            '--offset',
+            type=int,
+            default=0,
+            help='Сколько заказов из начала файла пропустить, например '
+                 'чтобы продолжить прерванную загрузку',
+        )
+
+    def handle(self, *args, **options):
+        input_format = options['format'] or (
+            'csv' if options['input'].endswith('.csv') else 'jsonl')
+        read_orders = (
+            read_csv_orders if input_format == 'csv' else read_jsonl_orders)
+        products_ids, restaurants_ids = get_import_context()
+
+        processed_count = options['offset']
+        imported_count = 0
+        with open(options['input'], encoding='utf-8', newline='') as input_file:
+            orders = islice(read_orders(input_file), options['offset'], None)
+            while True:
+                batch = list(islice(orders, options['batch_size']))
+                if not batch:
+                    break
+                imported_count += import_orders_batch(
+                    batch, products_ids, restaurants_ids)
+                processed_count += len(batch)
+                self.stderr.write(
+                    f'Загружено заказов: {imported_count}, '
+                    f'обработано заказов из файла: {processed_count}. '
+                    f'Продолжить можно с --offset {processed_count}'
+                )
+
+        skipped_count = processed_count - options['offset'] - imported_count
+        if skipped_count:
+            self.stderr.write(self.style.WARNING(
+                f'Пропущено заказов с неизвестными товарами: {skipped_count}'
+            ))
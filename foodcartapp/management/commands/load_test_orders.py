@@ -0,0 +1,111 @@
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+from foodcartapp.models import Product
+
+
+def get_percentile(sorted_values, percent):
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * percent / 100))
+    return sorted_values[index]
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест оформления заказов: отправляет заказы на '
+        'запущенный сайт и сравнивает пропускную способность адресов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'urls',
+            nargs='+',
+            help='Адреса API заказов, например '
+                 'http://127.0.0.1:8000/api/order/',
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=500,
+            help='Сколько заказов отправить на каждый адрес',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=50,
+            help='Сколько заказов отправлять одновременно',
+        )
+        parser.add_argument(
+            '--products',
+            help='id товаров через запятую. По умолчанию первые '
+                 'три доступных товара из базы',
+        )
+        parser.add_argument('--timeout', type=float, default=30)
+
+    def handle(self, *args, **options):
+        if options['products']:
+            products_ids = [
+                int(product_id)
+                for product_id in options['products'].split(',')
+            ]
+        else:
+            products_ids = list(
+                Product.objects.available().values_list('pk', flat=True)[:3])
+        if not products_ids:
+            raise CommandError('Нет доступных товаров для заказа')
+
+        for url in options['urls']:
+            result = self.run_load_test(url, products_ids, options)
+            self.stdout.write(
+                f'{url}\n'
+                f'  успешно: {result["ok"]}, ошибок: {result["errors"]}\n'
+                f'  заказов в секунду: {result["rps"]:.1f}\n'
+                f'  время ответа, мс: p50 {result["p50_ms"]:.0f}, '
+                f'p95 {result["p95_ms"]:.0f}, p99 {result["p99_ms"]:.0f}'
+            )
+
+    def run_load_test(self, url, products_ids, options):
+        sessions = threading.local()
+
+        def send_order(order_number):
+            if not hasattr(sessions, 'session'):
+                sessions.session = requests.Session()
+            order = {
+                'products': [
+                    {'product': product_id, 'quantity': 1}
+                    for product_id in products_ids
+                ],
+                'firstname': 'Нагрузка',
+                'lastname': f'№{order_number}',
+                'phonenumber': '+79160000000',
+                'address': f'Москва, ул. Тверская, д. {order_number}',
+            }
+            started_at = time.perf_counter()
+            try:
+                response = sessions.session.post(
+                    url, json=order, timeout=options['timeout'])
+                is_ok = response.ok and 'id' in response.json()
+            except (requests.RequestException, ValueError):
+                is_ok = False
+            return is_ok, time.perf_counter() - started_at
+
+        started_at = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            results = list(pool.map(send_order, range(options['requests'])))
+        duration = time.perf_counter() - started_at
+
+        latencies = sorted(
+            latency * 1000 for is_ok, latency in results if is_ok)
+        ok_count = len(latencies)
+        return {
+            'ok': ok_count,
+            'errors': len(results) - ok_count,
+            'rps': ok_count / duration,
+            'p50_ms': statistics.median(latencies) if latencies else 0,
+            'p95_ms': get_percentile(latencies, 95) if latencies else 0,
+            'p99_ms': get_percentile(latencies, 99) if latencies else 0,
+        }
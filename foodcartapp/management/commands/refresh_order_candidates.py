@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from foodcartapp.models import Order
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рестораны, которые могут выполнить необработанные заказы'
+
+    def handle(self, *args, **options):
+        orders = Order.objects.filter(status='new_order')
+        orders.refresh_restaurant_candidates()
+        self.stdout.write(f'Обработано заказов: {orders.count()}')
@@ -0,0 +1,233 @@
+import json
+import statistics
+import subprocess
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+
+from foodcartapp.models import Product
+from star_burger.query_budget import count_queries, get_budget_violations
+
+
+SCALES = {
+    'small': {
+        'restaurants': 5,
+        'products': 50,
+        'menu_density': 0.8,
+        'completed_orders': 200,
+        'pending_orders': 20,
+    },
+    'medium': {
+        'restaurants': 20,
+        'products': 300,
+        'menu_density': 0.7,
+        'completed_orders': 2000,
+        'pending_orders': 200,
+    },
+    'large': {
+        'restaurants': 50,
+        'products': 1000,
+        'menu_density': 0.6,
+        'completed_orders': 20000,
+        'pending_orders': 1000,
+    },
+}
+
+
+def get_git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure(view_name, make_request, repeat):
+    timings = []
+    counters = []
+    violations = set()
+    for _ in range(repeat):
+        with count_queries() as counter:
+            started_at = time.perf_counter()
+            response = make_request()
+            timings.append((time.perf_counter() - started_at) * 1000)
+        counters.append(counter)
+        violations.update(get_budget_violations(view_name, counter))
+        if response.status_code >= 400:
+            raise CommandError(
+                f'{response.request["PATH_INFO"]} ответил '
+                f'{response.status_code}'
+            )
+
+    return {
+        'view_name': view_name,
+        'status': response.status_code,
+        'response_bytes': len(response.content),
+        'queries': max(counter.queries for counter in counters),
+        'db_median_ms': round(
+            statistics.median(counter.db_time_ms for counter in counters), 2),
+        'budget_violations': sorted(violations),
+        'first_ms': round(timings[0], 2),
+        'median_ms': round(statistics.median(timings), 2),
+        'min_ms': round(min(timings), 2),
+        'max_ms': round(max(timings), 2),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет время ответа и число SQL-запросов ключевых страниц '
+        'на синтетических данных разного размера. Данные создаются '
+        'во временной тестовой базе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scales',
+            default='small,medium',
+            help=f'Размеры данных через запятую: {", ".join(SCALES)}',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=10,
+            help='Сколько раз запрашивать каждую страницу',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--output',
+            default='benchmark_report.json',
+            help='Куда сохранить JSON-отчет',
+        )
+        parser.add_argument(
+            '--check-budgets',
+            action='store_true',
+            help='Завершиться с ошибкой, если страница превысила '
+                 'бюджет запросов к базе из QUERY_BUDGETS',
+        )
+
+    def handle(self, *args, **options):
+        scales = [scale.strip() for scale in options['scales'].split(',')]
+        unknown_scales = set(scales) - set(SCALES)
+        if unknown_scales:
+            raise CommandError(
+                f'Неизвестные размеры данных: {", ".join(unknown_scales)}')
+
+        report = {
+            'created_at': timezone.now().isoformat(),
+            'git_commit': get_git_commit(),
+            'database': connection.vendor,
+            'repeat': options['repeat'],
+            'scales': [],
+        }
+
+        setup_test_environment()
+        old_database_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(
+            verbosity=0,
+            autoclobber=True,
+            serialize=False,
+        )
+        try:
+            for scale in scales:
+                self.stdout.write(f'Замеряю {scale}...')
+                report['scales'].append({
+                    'name': scale,
+                    'dataset': SCALES[scale],
+                    'endpoints': self.run_scale(scale, options),
+                })
+        finally:
+            connection.creation.destroy_test_db(old_database_name, verbosity=0)
+            teardown_test_environment()
+
+        with open(options['output'], 'w') as report_file:
+            json.dump(report, report_file, ensure_ascii=False, indent=4)
+        self.stdout.write(self.style.SUCCESS(
+            f'Отчет сохранен в {options["output"]}'))
+
+        violations = [
+            f'{scale["name"]} {name}: {violation}'
+            for scale in report['scales']
+            for name, result in scale['endpoints'].items()
+            for violation in result['budget_violations']
+        ]
+        if options['check_budgets'] and violations:
+            raise CommandError(
+                'Превышены бюджеты запросов к базе:\n' + '\n'.join(violations))
+
+    def run_scale(self, scale, options):
+        cache.clear()
+        call_command(
+            'generate_dataset',
+            clear=True,
+            seed=options['seed'],
+            stdout=self.stdout,
+            **SCALES[scale],
+        )
+
+        manager, _ = User.objects.get_or_create(
+            username='benchmark',
+            defaults={'is_staff': True},
+        )
+        manager_client = Client()
+        manager_client.force_login(manager)
+        client = Client()
+
+        products_ids = list(
+            Product.objects.available().values_list('pk', flat=True)[:5])
+        order = {
+            'products': [
+                {'product': product_id, 'quantity': 2}
+                for product_id in products_ids
+            ],
+            'firstname': 'Иван',
+            'lastname': 'Петров',
+            'phonenumber': '+79160000000',
+            'address': 'Москва, ул. Тверская, д. 1',
+        }
+
+        endpoints = {
+            'view_orders': (
+                'restaurateur:view_orders',
+                lambda: manager_client.get(reverse('restaurateur:view_orders')),
+            ),
+            'view_products': (
+                'restaurateur:ProductsView',
+                lambda: manager_client.get(reverse('restaurateur:ProductsView')),
+            ),
+            'product_list_api': (
+                'foodcartapp:product_list_api',
+                lambda: client.get(
+                    reverse('foodcartapp:product_list_api'),
+                    HTTP_ACCEPT_ENCODING='gzip, br',
+                ),
+            ),
+            'register_order': (
+                'foodcartapp:register_order',
+                lambda: client.post(
+                    reverse('foodcartapp:register_order'),
+                    data=order,
+                    content_type='application/json',
+                ),
+            ),
+        }
+        results = {}
+        for name, (view_name, make_request) in endpoints.items():
+            results[name] = measure(view_name, make_request, options['repeat'])
+            self.stdout.write(
+                f'  {name}: {results[name]["median_ms"]} мс, '
+                f'{results[name]["queries"]} SQL-запросов'
+            )
+        return results
@@ -0,0 +1,28 @@
+# Generated by Django 3.2 on 2026-10-18 05:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0051_alter_order_restaurant'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderRestaurantCandidate',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('distance_km', models.FloatField(blank=True, null=True, verbose_name='расстояние доставки, км')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='restaurant_candidates', to='foodcartapp.order', verbose_name='заказ')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_candidates', to='foodcartapp.restaurant', verbose_name='ресторан')),
+            ],
+            options={
+                'verbose_name': 'ресторан, который может выполнить заказ',
+                'verbose_name_plural': 'рестораны, которые могут выполнить заказ',
+                'unique_together': {('order', 'restaurant')},
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 3.2 on 2026-10-18 05:35
+
+import django.core.validators
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+
+
+def fill_total_price(apps, schema_editor):
+    Order = apps.get_model('foodcartapp', 'Order')
+    ProductInOrder = apps.get_model('foodcartapp', 'ProductInOrder')
+    order_items_price = (
+        ProductInOrder.objects
+            .filter(order=OuterRef('pk'))
+            .values('order')
+            .annotate(total_price=Sum('products_price'))
+            .values('total_price')
+    )
+    Order.objects.filter(order_items__isnull=False).update(
+        total_price=Subquery(order_items_price)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0052_orderrestaurantcandidate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='total_price',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=0, max_digits=10, validators=[django.core.validators.MinValueValidator(0)], verbose_name='стоимость заказа'),
+        ),
+        migrations.RunPython(fill_total_price, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 3.2 on 2026-10-18 05:37
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+
+def link_places(apps, schema_editor):
+    Order = apps.get_model('foodcartapp', 'Order')
+    Restaurant = apps.get_model('foodcartapp', 'Restaurant')
+    Place = apps.get_model('places', 'Place')
+
+    addresses = set(Order.objects.values_list('address', flat=True))
+    addresses.update(Restaurant.objects.values_list('address', flat=True))
+    addresses.discard('')
+    Place.objects.bulk_create(
+        [Place(address=address, status='pending') for address in addresses],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+    place_ids = Place.objects.filter(address=OuterRef('address')).values('pk')
+    Order.objects.update(place=Subquery(place_ids[:1]))
+    Restaurant.objects.update(place=Subquery(place_ids[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('places', '0004_place_pending_status'),
+        ('foodcartapp', '0053_order_total_price'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='place',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='orders', to='places.place', verbose_name='место доставки'),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='place',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='restaurants', to='places.place', verbose_name='место'),
+        ),
+        migrations.RunPython(link_places, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 3.2 on 2026-10-18 05:45
+
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0054_order_restaurant_place'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderIdempotencyKey',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255, unique=True, verbose_name='ключ идемпотентности')),
+                ('request_hash', models.CharField(max_length=64, verbose_name='хэш запроса')),
+                ('response_status', models.PositiveSmallIntegerField(verbose_name='HTTP-статус ответа')),
+                ('response_data', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='ответ')),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='время создания')),
+                ('order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='idempotency_keys', to='foodcartapp.order', verbose_name='заказ')),
+            ],
+            options={
+                'verbose_name': 'ключ идемпотентности заказа',
+                'verbose_name_plural': 'ключи идемпотентности заказов',
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 3.2 on 2026-10-18 06:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0057_order_updated_at'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='order',
+            name='order_updated_at_id_idx',
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='revision',
+            field=models.BigIntegerField(default=0, editable=False, verbose_name='ревизия'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['revision', 'id'], name='order_revision_id_idx'),
+        ),
+    ]
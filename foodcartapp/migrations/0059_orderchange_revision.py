@@ -0,0 +1,22 @@
+# Generated by Django 3.2 on 2026-10-18 06:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0058_order_revision'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderchange',
+            name='revision',
+            field=models.BigIntegerField(default=0, editable=False, verbose_name='ревизия'),
+        ),
+        migrations.AddIndex(
+            model_name='orderchange',
+            index=models.Index(fields=['revision', 'id'], name='orderchange_revision_id_idx'),
+        ),
+    ]
@@ -1,7 +1,11 @@
-from operator import itemgetter
-
-from django.db import models
-from django.db.models import Sum, F, Prefetch
+from math import isnan
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.db.models import Count, Sum, F, OuterRef, Prefetch, Subquery
+from django.db.models import Value
+from django.db.models.functions import Coalesce
 from django.core.validators import MinValueValidator
 from django.utils import timezone
 from phonenumber_field.modelfields import PhoneNumberField
@@ -9,6 +13,10 @@ from phonenumber_field.modelfields import PhoneNumberField
 from places.coordinates_utils import calculate_delivery_distance
 from places.models import Place
 
+from .order_feed import get_order_feed_broker
+from .restaurant_index import get_restaurant_index
+from .revisions import get_current_revision
+
 
 class Restaurant(models.Model):
     name = models.CharField(
@@ -25,6 +33,14 @@ class Restaurant(models.Model):
         max_length=50,
         blank=True,
     )
+    place = models.ForeignKey(
+        Place,
+        verbose_name='место',
+        related_name='restaurants',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+    )
 
     class Meta:
         verbose_name = 'ресторан'
@@ -33,6 +49,19 @@ class Restaurant(models.Model):
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        restaurant = super().from_db(db, field_names, values)
+        # Запоминаем место из базы, чтобы после сохранения понять,
+        # сменилось ли местоположение ресторана
+        if 'place_id' in field_names:
+            restaurant.loaded_place_id = values[field_names.index('place_id')]
+        return restaurant
+
+    def is_location_changed(self):
+        return not hasattr(self, 'loaded_place_id') \
+            or self.loaded_place_id != self.place_id
+
 
 class ProductQuerySet(models.QuerySet):
     def available(self):
@@ -132,56 +161,129 @@ class RestaurantMenuItem(models.Model):
 
 
 class OrderQuerySet(models.QuerySet):
-    def calculate_order_price(self):
-        order_price = self.annotate(
-            total_order_price=Sum(
-                F('order_items__products_price'),
+    @transaction.atomic(savepoint=False)
+    def update_total_price(self):
+        order_items_price = (
+            ProductInOrder.objects
+                .filter(order=OuterRef('pk'))
+                .values('order')
+                .annotate(total_price=Sum('products_price'))
+                .values('total_price')
+        )
+        return self.update(
+            total_price=Coalesce(
+                Subquery(order_items_price),
+                Value(0),
+                output_field=models.DecimalField(),
             ),
+            updated_at=timezone.now(),
+            revision=get_current_revision(),
         )
-        return order_price
 
     def get_available_restaurants(self):
-        orders = self.prefetch_related(
-            'order_items__product__menu_items__restaurant')
-        restaurants = Restaurant.objects.all()
-        order_addresses = orders.values_list('address', flat=True)
-        restaurant_addresses = restaurants.values_list('address', flat=True)
-        orders_places = Place.objects.filter(address__in=order_addresses)
-        restaurant_places = Place.objects.filter(
-            address__in=restaurant_addresses)
-        order_coordinates_by_addresses = {
-            place.address: (place.lat, place.lon) for place in orders_places
-        }
-        restaurant_coordinates_by_addresses = {
-            place.address: (place.lat, place.lon) for place
-            in restaurant_places
-        }
+        return self.prefetch_related(
+            Prefetch(
+                'restaurant_candidates',
+                queryset=OrderRestaurantCandidate.objects
+                    .select_related('restaurant')
+                    .order_by(F('distance_km').asc(nulls_last=True)),
+                to_attr='candidates',
+            )
+        )
 
-        for order in orders:
-            available_restaurants = set()
-            products_in_order = order.order_items.all()
-            for product_in_order in products_in_order:
-                if not available_restaurants:
-                    available_restaurants = set(
-                        menu_item.restaurant for menu_item in
-                        product_in_order.product.menu_items.all())
-                else:
-
-                    available_restaurants = available_restaurants.intersection(
-                        set(menu_item.restaurant for menu_item in
-                            product_in_order.product.menu_items.all())
+    def get_eligible_restaurants(self):
+        order_products_count = (
+            ProductInOrder.objects
+                .filter(order=OuterRef('order'))
+                .values('order')
+                .annotate(products_count=Count('product', distinct=True))
+                .values('products_count')
+        )
+        return (
+            ProductInOrder.objects
+                .filter(
+                    order__in=self,
+                    product__menu_items__availability=True,
+                )
+                .values('order', 'product__menu_items__restaurant')
+                .annotate(
+                    available_products_count=Count('product', distinct=True),
+                    order_products_count=Subquery(order_products_count),
+                )
+                .filter(available_products_count=F('order_products_count'))
+                .values_list('order', 'product__menu_items__restaurant')
+        )
+
+    def calculate_restaurant_candidates(self):
+        orders = {order.pk: order for order in self.select_related('place')}
+
+        restaurant_index = get_restaurant_index()
+        nearby_restaurants = {}
+        for order in orders.values():
+            if order.place and order.place.coordinates:
+                nearby_restaurants[order.pk] = {
+                    restaurant_id for restaurant_id, _
+                    in restaurant_index.nearest(
+                        order.place.coordinates,
+                        radius_km=settings.DELIVERY_RADIUS_KM,
                     )
+                }
+        eligible_restaurants = [
+            (order_id, restaurant_id)
+            for order_id, restaurant_id in self.get_eligible_restaurants()
+            if order_id not in nearby_restaurants
+            or restaurant_id not in restaurant_index.points
+            or restaurant_id in nearby_restaurants[order_id]
+        ]
 
-            restaurants_with_distance = calculate_delivery_distance(
-                order_coordinates_by_addresses,
-                restaurant_coordinates_by_addresses,
-                order.address,
-                list(available_restaurants)
-            )
+        restaurants = {
+            restaurant.pk: restaurant
+            for restaurant in Restaurant.objects
+                .filter(pk__in={
+                    restaurant_id for _, restaurant_id in eligible_restaurants
+                })
+                .select_related('place')
+        }
 
-            order.restaurants = sorted(restaurants_with_distance,
-                                       key=itemgetter(1))
-        return orders
+        order_positions = {
+            order_id: position for position, order_id in enumerate(orders)
+        }
+        restaurant_positions = {
+            restaurant_id: position
+            for position, restaurant_id in enumerate(restaurants)
+        }
+        distances = calculate_delivery_distance(
+            [order.place for order in orders.values()],
+            [restaurant.place for restaurant in restaurants.values()],
+        )
+
+        candidates = []
+        for order_id, restaurant_id in eligible_restaurants:
+            delivery_distance = distances[
+                order_positions[order_id],
+                restaurant_positions[restaurant_id],
+            ]
+            candidates.append(OrderRestaurantCandidate(
+                order_id=order_id,
+                restaurant_id=restaurant_id,
+                distance_km=None if isnan(delivery_distance)
+                else round(float(delivery_distance), 2),
+            ))
+        return candidates
+
+    @transaction.atomic
+    def refresh_restaurant_candidates(self):
+        orders_ids = list(self.values_list('pk', flat=True))
+        orders = self.filter(status='new_order')
+        candidates = orders.calculate_restaurant_candidates()
+        OrderRestaurantCandidate.objects.filter(
+            order__in=orders_ids).delete()
+        OrderRestaurantCandidate.objects.bulk_create(candidates)
+        Order.objects.filter(pk__in=orders_ids).update(
+            updated_at=timezone.now(),
+            revision=get_current_revision(),
+        )
+        OrderChange.objects.record(orders_ids)
 
 
 class Order(models.Model):
@@ -217,6 +319,15 @@ class Order(models.Model):
         max_length=200,
     )
 
+    place = models.ForeignKey(
+        Place,
+        verbose_name='место доставки',
+        related_name='orders',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+    )
+
     restaurant = models.ForeignKey(
         Restaurant,
         verbose_name='ресторан доставки',
@@ -247,6 +358,15 @@ class Order(models.Model):
         blank=True,
     )
 
+    total_price = models.DecimalField(
+        'стоимость заказа',
+        max_digits=10,
+        decimal_places=2,
+        default=0,
+        db_index=True,
+        validators=[MinValueValidator(0)],
+    )
+
     order_time = models.DateTimeField(
         'время создания заказа',
         default=timezone.now,
@@ -267,15 +387,38 @@ class Order(models.Model):
         db_index=True,
     )
 
+    updated_at = models.DateTimeField(
+        'время последнего изменения',
+        auto_now=True,
+    )
+
+    revision = models.BigIntegerField(
+        'ревизия',
+        default=0,
+        editable=False,
+    )
+
     objects = OrderQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'заказ'
         verbose_name_plural = 'заказы'
+        indexes = [
+            models.Index(
+                fields=['revision', 'id'],
+                name='order_revision_id_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"Заказ: {self.pk} от {self.order_time}"
 
+    def save(self, *args, **kwargs):
+        # Ревизия должна принадлежать той же транзакции, что и изменение
+        with transaction.atomic(savepoint=False):
+            self.revision = get_current_revision()
+            super().save(*args, **kwargs)
+
 
 class ProductInOrder(models.Model):
     order = models.ForeignKey(
@@ -310,3 +453,124 @@ class ProductInOrder(models.Model):
 
     def __str__(self):
         return self.product.name
+
+
+class OrderRestaurantCandidate(models.Model):
+    order = models.ForeignKey(
+        Order,
+        on_delete=models.CASCADE,
+        related_name='restaurant_candidates',
+        verbose_name='заказ',
+    )
+
+    restaurant = models.ForeignKey(
+        Restaurant,
+        on_delete=models.CASCADE,
+        related_name='order_candidates',
+        verbose_name='ресторан',
+    )
+
+    distance_km = models.FloatField(
+        'расстояние доставки, км',
+        null=True,
+        blank=True,
+    )
+
+    class Meta:
+        verbose_name = 'ресторан, который может выполнить заказ'
+        verbose_name_plural = 'рестораны, которые могут выполнить заказ'
+        unique_together = [
+            ['order', 'restaurant']
+        ]
+
+    def __str__(self):
+        return f"{self.order_id} - {self.restaurant_id}"
+
+
+class OrderIdempotencyKey(models.Model):
+    key = models.CharField(
+        'ключ идемпотентности',
+        max_length=255,
+        unique=True,
+    )
+
+    request_hash = models.CharField(
+        'хэш запроса',
+        max_length=64,
+    )
+
+    order = models.ForeignKey(
+        Order,
+        on_delete=models.CASCADE,
+        related_name='idempotency_keys',
+        verbose_name='заказ',
+        null=True,
+        blank=True,
+    )
+
+    response_status = models.PositiveSmallIntegerField('HTTP-статус ответа')
+
+    response_data = models.JSONField(
+        'ответ',
+        encoder=DjangoJSONEncoder,
+    )
+
+    created_at = models.DateTimeField(
+        'время создания',
+        default=timezone.now,
+        db_index=True,
+    )
+
+    class Meta:
+        verbose_name = 'ключ идемпотентности заказа'
+        verbose_name_plural = 'ключи идемпотентности заказов'
+
+    def __str__(self):
+        return self.key
+
+    def is_expired(self):
+        expires_at = self.created_at + settings.ORDER_IDEMPOTENCY_KEY_TTL
+        return expires_at < timezone.now()
+
+
+class OrderChangeQuerySet(models.QuerySet):
+    def record(self, orders_ids):
+        if not orders_ids:
+            return
+        revision = get_current_revision()
+        self.bulk_create([
+            OrderChange(order_id=order_id, revision=revision)
+            for order_id in orders_ids
+        ])
+        transaction.on_commit(get_order_feed_broker().publish)
+
+
+class OrderChange(models.Model):
+    order_id = models.PositiveIntegerField('id заказа')
+
+    revision = models.BigIntegerField(
+        'ревизия',
+        default=0,
+        editable=False,
+    )
+
+    created_at = models.DateTimeField(
+        'время изменения',
+        default=timezone.now,
+        db_index=True,
+    )
+
+    objects = OrderChangeQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'изменение заказа'
+        verbose_name_plural = 'журнал изменений заказов'
+        indexes = [
+            models.Index(
+                fields=['revision', 'id'],
+                name='orderchange_revision_id_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.order_id} - {self.created_at}"
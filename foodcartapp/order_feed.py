@@ -0,0 +1,39 @@
+import threading
+
+
+class LocalOrderFeedBroker:
+    """Будит тех, кто ждет новых записей в журнале изменений заказов.
+
+    Брокер работает внутри одного процесса. Изменения из других процессов
+    лента заказов замечает, перечитывая журнал раз в
+    ORDER_FEED_POLL_INTERVAL секунд.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self.condition = threading.Condition()
+
+    def publish(self):
+        with self.condition:
+            self.version += 1
+            self.condition.notify_all()
+
+    def wait(self, version, timeout):
+        with self.condition:
+            return self.condition.wait_for(
+                lambda: self.version != version,
+                timeout,
+            )
+
+
+_order_feed_broker = None
+_order_feed_broker_lock = threading.Lock()
+
+
+def get_order_feed_broker():
+    global _order_feed_broker
+
+    with _order_feed_broker_lock:
+        if _order_feed_broker is None:
+            _order_feed_broker = LocalOrderFeedBroker()
+    return _order_feed_broker
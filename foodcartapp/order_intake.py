@@ -0,0 +1,170 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from places.coordinates_utils import get_or_create_places
+
+from .bulk import bulk_create_and_fetch
+from .models import Order, ProductInOrder
+from .revisions import get_current_revision
+from .signals import schedule_candidates_refresh
+
+
+logger = logging.getLogger(__name__)
+
+
+def save_orders(orders_data):
+    """Сохраняет заказы пачкой, по одному запросу на места, заказы и позиции."""
+    products_in_orders = [
+        [
+            ProductInOrder(
+                product_id=product['product'],
+                quantity=product['quantity'],
+                products_price=product['price'] * product['quantity'],
+            )
+            for product in order_data['products']
+        ]
+        for order_data in orders_data
+    ]
+    with transaction.atomic(savepoint=False):
+        places = get_or_create_places(
+            {order_data['address'] for order_data in orders_data})
+        revision = get_current_revision()
+        orders = bulk_create_and_fetch(Order, [
+            Order(
+                firstname=order_data['firstname'],
+                lastname=order_data['lastname'],
+                phonenumber=order_data['phonenumber'],
+                address=order_data['address'],
+                place=places.get(order_data['address']),
+                total_price=sum(
+                    product_in_order.products_price
+                    for product_in_order in products_in_order
+                ),
+                revision=revision,
+            )
+            for order_data, products_in_order
+            in zip(orders_data, products_in_orders)
+        ])
+        for order, products_in_order in zip(orders, products_in_orders):
+            for product_in_order in products_in_order:
+                product_in_order.order = order
+        ProductInOrder.objects.bulk_create([
+            product_in_order
+            for products_in_order in products_in_orders
+            for product_in_order in products_in_order
+        ])
+        # bulk_create не отправляет post_save, кандидатов пересчитываем сами
+        schedule_candidates_refresh([order.pk for order in orders])
+    return orders
+
+
+class OrderWriter:
+    """Записывает заказы в базу пачками в отдельном потоке.
+
+    Заказы, пришедшие почти одновременно, сохраняются в одной транзакции:
+    поток ждет новые заказы не дольше max_delay секунд или пока пачка
+    не наберет batch_size заказов. Если пачку сохранить не удалось,
+    заказы из нее сохраняются по одному.
+    """
+
+    def __init__(self, batch_size=20, max_delay=0.01):
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, order_data):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name='order-writer',
+                    daemon=True,
+                )
+                self._thread.start()
+
+        future = Future()
+        self._queue.put((order_data, future))
+        return future
+
+    def get_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return [
+            (order_data, future) for order_data, future in batch
+            if future.set_running_or_notify_cancel()
+        ]
+
+    def _run(self):
+        while True:
+            batch = self.get_batch()
+            if not batch:
+                continue
+            close_old_connections()
+            self.write_batch(batch)
+
+    def write_batch(self, batch):
+        committed = False
+
+        def mark_committed():
+            nonlocal committed
+            committed = True
+
+        try:
+            with transaction.atomic():
+                # Выполнится первым из колбэков после коммита
+                transaction.on_commit(mark_committed)
+                orders = save_orders([order_data for order_data, _ in batch])
+        except Exception as error:
+            if committed:
+                # Заказы уже в базе, упал один из колбэков после коммита.
+                # Повторять запись нельзя, иначе заказы сохранятся дважды
+                logger.exception('Ошибка после сохранения заказов')
+                self.set_results(batch, orders)
+                return
+            if len(batch) == 1:
+                _, future = batch[0]
+                future.set_exception(error)
+                return
+            # Пачка откатилась целиком, сохраняем заказы по одному, чтобы
+            # ошибка досталась только тому заказу, который ее вызвал
+            for order_data, future in batch:
+                self.write_batch([(order_data, future)])
+        else:
+            self.set_results(batch, orders)
+
+    @staticmethod
+    def set_results(batch, orders):
+        for (_, future), order in zip(batch, orders):
+            future.set_result(order)
+
+
+_order_writer = None
+_order_writer_lock = threading.Lock()
+
+
+def get_order_writer():
+    global _order_writer
+
+    with _order_writer_lock:
+        if _order_writer is None:
+            _order_writer = OrderWriter(
+                batch_size=settings.ORDER_WRITER_BATCH_SIZE,
+                max_delay=settings.ORDER_WRITER_MAX_DELAY_MS / 1000,
+            )
+    return _order_writer
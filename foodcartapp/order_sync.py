@@ -0,0 +1,82 @@
+import base64
+
+from django.db.models import Q
+
+from .models import Order
+from .revisions import get_visible_revision
+
+
+def encode_cursor(order):
+    return base64.urlsafe_b64encode(
+        f'{order.revision},{order.pk}'.encode()
+    ).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        revision, order_id = base64.urlsafe_b64decode(
+            cursor.encode()).decode().split(',')
+        return int(revision), int(order_id)
+    except (TypeError, UnicodeError, ValueError) as error:
+        raise ValueError(f'Некорректный курсор: {cursor}') from error
+
+
+def get_changed_orders(cursor=None, limit=100):
+    """Заказы, измененные после курсора, по возрастанию ревизии.
+
+    Заказы из транзакций, которые могут быть еще не закрыты, не
+    отдаются, иначе клиент пропустил бы их, сдвинув курсор дальше.
+    Подробнее в модуле revisions.
+    """
+    orders = (
+        Order.objects
+        .filter(revision__lt=get_visible_revision())
+        .order_by('revision', 'pk')
+    )
+    if cursor:
+        revision, order_id = decode_cursor(cursor)
+        orders = orders.filter(
+            Q(revision__gt=revision)
+            | Q(revision=revision, pk__gt=order_id)
+        )
+    orders = list(
+        orders
+        .prefetch_related('order_items')
+        .get_available_restaurants()[:limit + 1]
+    )
+    return orders[:limit], len(orders) > limit
+
+
+def dump_order(order):
+    return {
+        'id': order.pk,
+        'status': order.status,
+        'payment_form': order.payment_form,
+        'firstname': order.firstname,
+        'lastname': order.lastname,
+        'phonenumber': str(order.phonenumber),
+        'address': order.address,
+        'comment': order.comment,
+        'total_price': order.total_price,
+        'order_time': order.order_time,
+        'call_time': order.call_time,
+        'delivery_time': order.delivery_time,
+        'updated_at': order.updated_at,
+        'restaurant': order.restaurant_id,
+        'products': [
+            {
+                'product': product_in_order.product_id,
+                'quantity': product_in_order.quantity,
+                'products_price': product_in_order.products_price,
+            }
+            for product_in_order in order.order_items.all()
+        ],
+        'candidates': [
+            {
+                'restaurant': candidate.restaurant_id,
+                'name': candidate.restaurant.name,
+                'distance_km': candidate.distance_km,
+            }
+            for candidate in order.candidates
+        ],
+    }
@@ -0,0 +1,186 @@
+import csv
+import json
+from itertools import groupby
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from places.coordinates_utils import get_or_create_places
+
+from .bulk import bulk_create_and_fetch
+from .models import Order, ProductInOrder, Product, Restaurant
+from .revisions import get_current_revision
+
+
+ORDER_FIELDS = [
+    'id',
+    'firstname',
+    'lastname',
+    'phonenumber',
+    'address',
+    'status',
+    'payment_form',
+    'comment',
+    'total_price',
+    'order_time',
+    'call_time',
+    'delivery_time',
+    'restaurant_id',
+]
+PRODUCT_IN_ORDER_FIELDS = ['product', 'quantity', 'products_price']
+NULLABLE_ORDER_FIELDS = [
+    'payment_form',
+    'call_time',
+    'delivery_time',
+    'restaurant_id',
+]
+CSV_FIELDS = ORDER_FIELDS + PRODUCT_IN_ORDER_FIELDS
+FORMATS = ['jsonl', 'csv']
+
+
+def iterate_orders(after_id=0, chunk_size=2000):
+    """Отдает заказы по возрастанию id вместе с их позициями.
+
+    Заказы и позиции читаются двумя курсорами на стороне сервера,
+    упорядоченными по id заказа, поэтому в памяти одновременно лежит
+    не больше chunk_size строк каждого курсора.
+    """
+    orders = (
+        Order.objects
+        .filter(pk__gt=after_id)
+        .order_by('pk')
+        .values(*ORDER_FIELDS)
+        .iterator(chunk_size=chunk_size)
+    )
+    products_in_orders = groupby(
+        ProductInOrder.objects
+        .filter(order_id__gt=after_id)
+        .order_by('order_id', 'pk')
+        .values('order_id', 'product_id', 'quantity', 'products_price')
+        .iterator(chunk_size=chunk_size),
+        key=lambda product_in_order: product_in_order['order_id'],
+    )
+
+    order_id, order_products = next(products_in_orders, (None, []))
+    for order in orders:
+        while order_id is not None and order_id < order['id']:
+            order_id, order_products = next(products_in_orders, (None, []))
+
+        products = []
+        if order_id == order['id']:
+            products = [
+                {
+                    'product': product_in_order['product_id'],
+                    'quantity': product_in_order['quantity'],
+                    'products_price': product_in_order['products_price'],
+                }
+                for product_in_order in order_products
+            ]
+        order['phonenumber'] = str(order['phonenumber'])
+        order['products'] = products
+        yield order
+
+
+class JSONLinesOrderWriter:
+    def __init__(self, output):
+        self.output = output
+
+    def write(self, order):
+        self.output.write(json.dumps(
+            order,
+            cls=DjangoJSONEncoder,
+            ensure_ascii=False,
+        ))
+        self.output.write('\n')
+
+
+class CSVOrderWriter:
+    def __init__(self, output, write_header=True):
+        self.writer = csv.DictWriter(output, fieldnames=CSV_FIELDS)
+        if write_header:
+            self.writer.writeheader()
+
+    def write(self, order):
+        order_row = {field: order[field] for field in ORDER_FIELDS}
+        for product_in_order in order['products'] or [{}]:
+            self.writer.writerow({**order_row, **product_in_order})
+
+
+def read_jsonl_orders(input_file):
+    for line in input_file:
+        if line.strip():
+            yield json.loads(line)
+
+
+def read_csv_orders(input_file):
+    rows = csv.DictReader(input_file)
+    for _, order_rows in groupby(rows, key=lambda row: row['id']):
+        order_rows = list(order_rows)
+        order = {field: order_rows[0][field] for field in ORDER_FIELDS}
+        for field in NULLABLE_ORDER_FIELDS:
+            order[field] = order[field] or None
+        order['products'] = [
+            {field: row[field] for field in PRODUCT_IN_ORDER_FIELDS}
+            for row in order_rows
+            if row['product']
+        ]
+        yield order
+
+
+@transaction.atomic
+def import_orders_batch(orders_data, products_ids, restaurants_ids):
+    """Сохраняет пачку заказов и возвращает, сколько из них сохранено.
+
+    Заказ пропускается, если в нем есть товар, которого нет в этой базе.
+    Ресторан, которого нет в этой базе, у заказа сбрасывается.
+    """
+    orders_data = [
+        order_data for order_data in orders_data
+        if all(
+            int(product_in_order['product']) in products_ids
+            for product_in_order in order_data['products']
+        )
+    ]
+    places = get_or_create_places(
+        {order_data['address'] for order_data in orders_data})
+
+    revision = get_current_revision()
+    orders = bulk_create_and_fetch(Order, [
+        Order(
+            **{
+                field: order_data[field]
+                for field in ORDER_FIELDS
+                if field not in ('id', 'restaurant_id')
+            },
+            restaurant_id=(
+                order_data['restaurant_id']
+                if order_data['restaurant_id'] is not None
+                and int(order_data['restaurant_id']) in restaurants_ids
+                else None
+            ),
+            place=places[order_data['address']],
+            revision=revision,
+        )
+        for order_data in orders_data
+    ])
+    ProductInOrder.objects.bulk_create([
+        ProductInOrder(
+            order=order,
+            product_id=product_in_order['product'],
+            quantity=product_in_order['quantity'],
+            products_price=product_in_order['products_price'],
+        )
+        for order, order_data in zip(orders, orders_data)
+        for product_in_order in order_data['products']
+    ])
+    Order.objects.filter(
+        pk__in=[order.pk for order in orders if order.status == 'new_order'],
+    ).refresh_restaurant_candidates()
+    return len(orders)
+
+
+def get_import_context():
+    return (
+        set(Product.objects.values_list('pk', flat=True)),
+        set(Restaurant.objects.values_list('pk', flat=True)),
+    )
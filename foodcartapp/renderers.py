@@ -0,0 +1,117 @@
+import gzip
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+MIN_COMPRESSED_CONTENT_LENGTH = 512
+
+
+_django_json_encoder = DjangoJSONEncoder()
+
+
+def convert_to_json_type(value):
+    """Приводит значение к типу JSON так же, как DjangoJSONEncoder."""
+    return _django_json_encoder.default(value)
+
+
+def encode_json(data, pretty=False):
+    if pretty:
+        return json.dumps(
+            data,
+            cls=DjangoJSONEncoder,
+            ensure_ascii=False,
+            indent=4,
+        ).encode()
+    if orjson:
+        # Даты orjson пишет по-своему, поэтому тоже отдаем их в default
+        return orjson.dumps(
+            data,
+            default=convert_to_json_type,
+            option=orjson.OPT_PASSTHROUGH_DATETIME,
+        )
+    return json.dumps(
+        data,
+        cls=DjangoJSONEncoder,
+        ensure_ascii=False,
+        separators=(',', ':'),
+    ).encode()
+
+
+def compress_content(content):
+    if len(content) < MIN_COMPRESSED_CONTENT_LENGTH:
+        return {}
+
+    compressed_content = {
+        'gzip': gzip.compress(content, compresslevel=6, mtime=0),
+    }
+    if brotli:
+        compressed_content['br'] = brotli.compress(content, quality=5)
+    return compressed_content
+
+
+def get_accepted_encodings(request):
+    accepted_encodings = set()
+    for encoding in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        name, _, params = encoding.strip().partition(';')
+        if params.replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted_encodings.add(name.strip().lower())
+    return accepted_encodings
+
+
+def is_pretty_json_requested(request):
+    return request.GET.get('pretty', '').lower() in ('1', 'true', 'yes')
+
+
+def make_json_response(request, content, compressed_content=None, etag=None,
+                       status=200):
+    if compressed_content is None:
+        compressed_content = compress_content(content)
+
+    accepted_encodings = get_accepted_encodings(request)
+    encoding = next(
+        (
+            encoding for encoding in ('br', 'gzip')
+            if encoding in accepted_encodings
+            and encoding in compressed_content
+        ),
+        None,
+    )
+
+    response = HttpResponse(
+        compressed_content[encoding] if encoding else content,
+        content_type='application/json',
+        status=status,
+    )
+    if compressed_content:
+        patch_vary_headers(response, ['Accept-Encoding'])
+    if encoding:
+        response['Content-Encoding'] = encoding
+
+    if etag is None:
+        return response
+    if encoding:
+        etag = f'{etag[:-1]}-{encoding}"'
+    response['ETag'] = etag
+    return get_conditional_response(request, etag=etag, response=response)
+
+
+def render_json(request, data, status=200):
+    return make_json_response(
+        request,
+        encode_json(data, pretty=is_pretty_json_requested(request)),
+        status=status,
+    )
@@ -0,0 +1,99 @@
+import threading
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from places.spatial_index import GeoGridIndex
+
+
+RESTAURANT_INDEX_VERSION_KEY = 'foodcartapp:restaurant_index_version'
+
+_restaurant_index = None
+_restaurant_index_version = None
+_restaurant_index_lock = threading.Lock()
+_pending_restaurants = threading.local()
+
+
+def load_restaurant_index():
+    from .models import Restaurant
+
+    restaurant_index = GeoGridIndex(settings.RESTAURANT_INDEX_CELL_SIZE_KM)
+    for restaurant_id, lat, lon in Restaurant.objects.filter(
+            place__lat__isnull=False,
+            place__lon__isnull=False,
+    ).values_list('pk', 'place__lat', 'place__lon'):
+        restaurant_index.add(restaurant_id, (lat, lon))
+    return restaurant_index
+
+
+def get_restaurant_index():
+    global _restaurant_index, _restaurant_index_version
+
+    version = cache.get(RESTAURANT_INDEX_VERSION_KEY)
+    if _restaurant_index is None or version != _restaurant_index_version:
+        _restaurant_index = load_restaurant_index()
+        _restaurant_index_version = version
+    return _restaurant_index
+
+
+def publish_restaurant_index_version():
+    global _restaurant_index_version
+
+    version = uuid4().hex
+    cache.set(RESTAURANT_INDEX_VERSION_KEY, version, timeout=None)
+    _restaurant_index_version = version
+
+
+def schedule_restaurant_location_update(restaurants_ids):
+    """Обновит индекс после коммита транзакции.
+
+    Координаты перечитываются из базы, поэтому изменения из откаченной
+    транзакции в индекс не попадут.
+    """
+    if not hasattr(_pending_restaurants, 'ids'):
+        _pending_restaurants.ids = set()
+    _pending_restaurants.ids.update(restaurants_ids)
+    transaction.on_commit(apply_restaurant_location_updates)
+
+
+def apply_restaurant_location_updates():
+    global _restaurant_index
+
+    from .models import Restaurant
+
+    restaurants_ids = getattr(_pending_restaurants, 'ids', set())
+    _pending_restaurants.ids = set()
+    if not restaurants_ids:
+        return
+
+    coordinates_by_restaurant = {
+        restaurant_id: (lat, lon)
+        for restaurant_id, lat, lon in Restaurant.objects.filter(
+            pk__in=restaurants_ids,
+            place__lat__isnull=False,
+            place__lon__isnull=False,
+        ).values_list('pk', 'place__lat', 'place__lon')
+    }
+    # Другие потоки продолжают искать по старому индексу, пока не будет
+    # готова измененная копия
+    with _restaurant_index_lock:
+        restaurant_index = get_restaurant_index().copy()
+        for restaurant_id in restaurants_ids:
+            if restaurant_id in coordinates_by_restaurant:
+                restaurant_index.add(
+                    restaurant_id,
+                    coordinates_by_restaurant[restaurant_id],
+                )
+            else:
+                restaurant_index.remove(restaurant_id)
+        _restaurant_index = restaurant_index
+        publish_restaurant_index_version()
+
+
+def reset_restaurant_index():
+    global _restaurant_index
+
+    _restaurant_index = None
+    transaction.on_commit(publish_restaurant_index_version)
@@ -0,0 +1,38 @@
+"""Ревизии заказов для выгрузки изменений по курсору.
+
+В PostgreSQL ревизия — номер транзакции, которая изменила заказ. Все
+транзакции с номером меньше xmin текущего снимка уже закрыты, поэтому
+заказы с такими ревизиями больше не появятся позади курсора, сколько бы
+ни шли транзакции. В других базах ревизия — время изменения в
+микросекундах, а отдаются только заказы старше ORDER_SYNC_LAG: считаем,
+что транзакции успевают закрыться за это время.
+"""
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+
+def to_revision(moment):
+    return int(moment.timestamp() * 1_000_000)
+
+
+def get_current_revision():
+    """Ревизия изменений текущей транзакции.
+
+    Вызывать внутри той же транзакции, в которой меняются заказы.
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT txid_current()')
+            return cursor.fetchone()[0]
+    return to_revision(timezone.now())
+
+
+def get_visible_revision():
+    """Ревизии меньше этой уже не изменятся задним числом."""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT txid_snapshot_xmin(txid_current_snapshot())')
+            return cursor.fetchone()[0]
+    return to_revision(timezone.now() - settings.ORDER_SYNC_LAG)
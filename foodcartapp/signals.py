@@ -0,0 +1,142 @@
+import threading
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from places.addresses import normalize_address
+from places.coordinates_utils import get_or_create_place
+from places.models import Place
+
+from .catalog import invalidate_availability_matrix
+from .catalog import invalidate_product_list
+from .models import Order, OrderChange, ProductInOrder
+from .models import Product, ProductCategory
+from .models import Restaurant, RestaurantMenuItem
+from .restaurant_index import apply_restaurant_location_updates
+from .restaurant_index import schedule_restaurant_location_update
+
+
+_pending_candidates = threading.local()
+
+
+def refresh_pending_candidates():
+    orders_ids = getattr(_pending_candidates, 'orders_ids', set())
+    _pending_candidates.orders_ids = set()
+    # Кандидаты считаются по индексу, в котором уже есть изменения
+    # ресторанов из этой же транзакции
+    apply_restaurant_location_updates()
+    if orders_ids:
+        Order.objects.filter(pk__in=orders_ids).refresh_restaurant_candidates()
+
+
+def schedule_candidates_refresh(orders_ids):
+    if not hasattr(_pending_candidates, 'orders_ids'):
+        _pending_candidates.orders_ids = set()
+    _pending_candidates.orders_ids.update(orders_ids)
+    transaction.on_commit(refresh_pending_candidates)
+
+
+@receiver(pre_save, sender=Order)
+@receiver(pre_save, sender=Restaurant)
+def resolve_place(sender, instance, **kwargs):
+    if instance.place_id and instance.place.normalized_address == \
+            normalize_address(instance.address):
+        return
+    instance.place = get_or_create_place(instance.address)
+
+
+@receiver(post_save, sender=Order)
+def refresh_order_candidates(sender, instance, **kwargs):
+    schedule_candidates_refresh([instance.pk])
+
+
+@receiver(post_delete, sender=Order)
+def record_order_deletion(sender, instance, **kwargs):
+    OrderChange.objects.record([instance.pk])
+
+
+@receiver(post_save, sender=ProductInOrder)
+@receiver(post_delete, sender=ProductInOrder)
+def refresh_order_items_candidates(sender, instance, **kwargs):
+    schedule_candidates_refresh([instance.order_id])
+
+
+@receiver(post_save, sender=Restaurant)
+def refresh_restaurant_candidates(sender, instance, created, update_fields,
+                                  **kwargs):
+    if update_fields is not None and \
+            not {'address', 'place', 'place_id'} & set(update_fields):
+        return
+    if not instance.is_location_changed():
+        return
+    # Если транзакция откатится, следующее сохранение снова увидит смену
+    # местоположения
+    transaction.on_commit(partial(
+        setattr, instance, 'loaded_place_id', instance.place_id))
+
+    schedule_restaurant_location_update([instance.pk])
+    if created:
+        return
+    schedule_candidates_refresh(
+        Order.objects
+        .filter(
+            status='new_order',
+            order_items__product__menu_items__restaurant=instance,
+        )
+        .values_list('pk', flat=True)
+        .distinct()
+    )
+
+
+@receiver(post_delete, sender=Restaurant)
+def remove_restaurant_location(sender, instance, **kwargs):
+    schedule_restaurant_location_update([instance.pk])
+
+
+@receiver(post_save, sender=RestaurantMenuItem)
+@receiver(post_delete, sender=RestaurantMenuItem)
+def refresh_menu_item_candidates(sender, instance, **kwargs):
+    schedule_candidates_refresh(
+        Order.objects
+        .filter(status='new_order', order_items__product=instance.product_id)
+        .values_list('pk', flat=True)
+    )
+
+
+@receiver(post_save, sender=Place)
+def refresh_place_candidates(sender, instance, **kwargs):
+    if instance.status == 'pending':
+        return
+    schedule_restaurant_location_update(
+        instance.restaurants.values_list('pk', flat=True))
+    schedule_candidates_refresh(
+        Order.objects
+        .filter(status='new_order')
+        .filter(
+            Q(place=instance)
+            | Q(order_items__product__menu_items__restaurant__place=instance)
+        )
+        .values_list('pk', flat=True)
+        .distinct()
+    )
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductCategory)
+@receiver(post_delete, sender=ProductCategory)
+@receiver(post_save, sender=RestaurantMenuItem)
+@receiver(post_delete, sender=RestaurantMenuItem)
+def reset_product_list_cache(sender, **kwargs):
+    # Иначе параллельный запрос успеет положить в кэш старые данные
+    # до конца транзакции
+    transaction.on_commit(invalidate_product_list)
+
+
+@receiver(post_save, sender=RestaurantMenuItem)
+@receiver(post_delete, sender=RestaurantMenuItem)
+def reset_availability_matrix_cache(sender, **kwargs):
+    transaction.on_commit(invalidate_availability_matrix)
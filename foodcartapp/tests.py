@@ -0,0 +1,692 @@
+import gzip
+import json
+from io import StringIO
+from concurrent.futures import Future
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock, skipUnless
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError, transaction
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+
+from places.models import Place
+from star_burger.query_budget import assert_query_budget
+
+from .catalog import get_availability_matrix
+from .catalog import get_available_product_prices
+from .models import Order, OrderIdempotencyKey
+from .models import Product, ProductInOrder, Restaurant, RestaurantMenuItem
+from .order_intake import OrderWriter
+from .order_transfer import import_orders_batch, iterate_orders
+from .renderers import brotli, encode_json, make_json_response
+from .restaurant_index import get_restaurant_index, reset_restaurant_index
+
+
+def create_product(price):
+    restaurant = Restaurant.objects.create(name='Star Burger')
+    product = Product.objects.create(
+        name='Бургер',
+        price=price,
+        image='burger.png',
+    )
+    RestaurantMenuItem.objects.create(restaurant=restaurant, product=product)
+    return product
+
+
+def get_order_data(product, quantity=1):
+    return {
+        'firstname': 'Иван',
+        'lastname': 'Петров',
+        'phonenumber': '+79991234567',
+        'address': 'Москва, Тверская улица, 1',
+        'products': [{
+            'product': product.pk,
+            'price': product.price,
+            'quantity': quantity,
+        }],
+    }
+
+
+class RegisterOrderQueriesTest(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            restaurant = Restaurant.objects.create(name='Star Burger')
+        self.products = [
+            Product.objects.create(
+                name=f'Бургер {number}',
+                price=100,
+                image='burger.png',
+            )
+            for number in range(10)
+        ]
+        for product in self.products:
+            RestaurantMenuItem.objects.create(
+                restaurant=restaurant,
+                product=product,
+            )
+
+    def register_order(self, products):
+        return self.client.post(
+            reverse('foodcartapp:register_order'),
+            {
+                'firstname': 'Иван',
+                'lastname': 'Петров',
+                'phonenumber': '+79991234567',
+                'address': 'Москва, Тверская улица, 1',
+                'products': [
+                    {'product': product.pk, 'quantity': 2}
+                    for product in products
+                ],
+            },
+            content_type='application/json',
+        )
+
+    # SQLite не возвращает pk из bulk_create, заказ перечитывается
+    # двумя запросами, в PostgreSQL их нет
+    def test_one_line_order(self):
+        with self.assertNumQueries(18):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.register_order(self.products[:1])
+        self.assertEqual(response.status_code, 200)
+
+    def test_ten_lines_order(self):
+        with self.assertNumQueries(18):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.register_order(self.products)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Order.objects.get().order_items.count(), 10)
+
+
+class RegisterOrderIdempotencyTest(TestCase):
+    def setUp(self):
+        product = create_product(Decimal('500'))
+        self.order_data = get_order_data(product)
+        del self.order_data['products'][0]['price']
+
+    def register_order(self, order_data, key='order-1'):
+        return self.client.post(
+            reverse('foodcartapp:register_order'),
+            order_data,
+            content_type='application/json',
+            HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def test_stored_response_is_replayed(self):
+        response = self.register_order(self.order_data)
+        replayed_response = self.register_order(self.order_data)
+
+        self.assertEqual(replayed_response.status_code, 200)
+        self.assertEqual(replayed_response['Idempotent-Replayed'], 'true')
+        self.assertEqual(replayed_response.json(), response.json())
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_other_request_with_same_key(self):
+        self.register_order(self.order_data)
+        self.order_data['firstname'] = 'Петр'
+
+        response = self.register_order(self.order_data)
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_expired_key_is_replaced(self):
+        self.register_order(self.order_data)
+        OrderIdempotencyKey.objects.update(
+            created_at=timezone.now() - timedelta(days=2))
+        self.order_data['firstname'] = 'Петр'
+
+        response = self.register_order(self.order_data)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Idempotent-Replayed'))
+        self.assertEqual(
+            OrderIdempotencyKey.objects.get().order_id,
+            response.json()['id'],
+        )
+
+    def test_invalid_order_is_not_stored(self):
+        response = self.register_order({**self.order_data, 'products': []})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(OrderIdempotencyKey.objects.exists())
+
+        response = self.register_order(self.order_data)
+        self.assertEqual(response.status_code, 200)
+
+    def test_concurrent_request_is_replayed(self):
+        response = self.register_order(self.order_data)
+        # Второй воркер не нашел ключ, потому что первый еще не закрыл
+        # транзакцию
+        find_key = OrderIdempotencyKey.objects.filter
+        lookups = [OrderIdempotencyKey.objects.none()]
+
+        def filter_keys(**kwargs):
+            return lookups.pop() if lookups else find_key(**kwargs)
+
+        with mock.patch.object(
+                OrderIdempotencyKey.objects, 'filter', filter_keys):
+            replayed_response = self.register_order(self.order_data)
+
+        self.assertEqual(replayed_response.status_code, 200)
+        self.assertEqual(replayed_response['Idempotent-Replayed'], 'true')
+        self.assertEqual(replayed_response.json(), response.json())
+        self.assertEqual(Order.objects.count(), 1)
+
+
+class RenderersTest(SimpleTestCase):
+    data = {
+        'created': datetime(2022, 5, 3, 15, 46, 1, 123456,
+                            tzinfo=dt_timezone.utc),
+        'day': date(2022, 5, 3),
+        'price': Decimal('199.90'),
+        'title': gettext_lazy('Бургер'),
+    }
+    expected_data = {
+        'created': '2022-05-03T15:46:01.123Z',
+        'day': '2022-05-03',
+        'price': '199.90',
+        'title': 'Бургер',
+    }
+
+    def test_compact_json_matches_pretty_json(self):
+        self.assertEqual(json.loads(encode_json(self.data)), self.expected_data)
+        self.assertEqual(
+            json.loads(encode_json(self.data, pretty=True)),
+            self.expected_data,
+        )
+
+    def test_json_without_orjson(self):
+        with mock.patch('foodcartapp.renderers.orjson', None):
+            content = encode_json(self.data)
+        self.assertEqual(json.loads(content), self.expected_data)
+
+    def get_response(self, accept_encoding):
+        request = RequestFactory().get(
+            '/', HTTP_ACCEPT_ENCODING=accept_encoding)
+        return make_json_response(request, encode_json([self.data] * 20))
+
+    def test_gzip(self):
+        response = self.get_response('gzip, br;q=0')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(
+            json.loads(gzip.decompress(response.content)),
+            [self.expected_data] * 20,
+        )
+
+    @skipUnless(brotli, 'brotli не установлен')
+    def test_brotli_is_preferred(self):
+        response = self.get_response('gzip, br')
+
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(
+            json.loads(brotli.decompress(response.content)),
+            [self.expected_data] * 20,
+        )
+
+    def test_identity(self):
+        response = self.get_response('identity')
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(
+            json.loads(response.content), [self.expected_data] * 20)
+
+
+def get_form_data(response):
+    """Данные формы админки в том виде, в каком их отправит браузер."""
+    forms = [response.context['adminform'].form]
+    for formset in response.context['inline_admin_formsets']:
+        management_form = formset.formset.management_form
+        forms.append(management_form)
+        forms.extend(formset.formset.forms)
+
+    data = {}
+    for form in forms:
+        for bound_field in form:
+            value = bound_field.value()
+            if value is None:
+                continue
+            widget = bound_field.field.widget
+            if hasattr(widget, 'decompress'):
+                for index, part in enumerate(widget.decompress(value)):
+                    if part is not None:
+                        data[f'{bound_field.html_name}_{index}'] = part
+            elif hasattr(value, 'pk'):
+                data[bound_field.html_name] = value.pk
+            else:
+                data[bound_field.html_name] = value
+    return data
+
+
+class OrderTotalPriceAdminTest(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin'))
+        product = create_product(Decimal('100'))
+        self.orders = []
+        for _ in range(2):
+            order = Order.objects.create(
+                firstname='Иван',
+                phonenumber='+79991234567',
+                address='Москва, Тверская улица, 1',
+                payment_form='cash',
+            )
+            ProductInOrder.objects.create(
+                order=order,
+                product=product,
+                quantity=1,
+                products_price=Decimal('100'),
+            )
+            Order.objects.filter(pk=order.pk).update_total_price()
+            self.orders.append(order)
+
+    def assert_total_prices(self, total_prices):
+        self.assertEqual(
+            [
+                Order.objects.get(pk=order.pk).total_price
+                for order in self.orders
+            ],
+            total_prices,
+        )
+        output = StringIO()
+        call_command('check_order_totals', stdout=output)
+        self.assertEqual(output.getvalue(), 'Расхождений не найдено\n')
+
+    def test_order_lines_are_edited_in_order_form(self):
+        order = self.orders[0]
+        url = reverse('admin:foodcartapp_order_change', args=[order.pk])
+        data = get_form_data(self.client.get(url))
+        data['order_items-0-quantity'] = 3
+        data['order_items-0-products_price'] = '300'
+
+        response = self.client.post(url, data)
+
+        self.assertEqual(response.status_code, 302)
+        self.assert_total_prices([Decimal('300'), Decimal('100')])
+
+    def test_order_line_is_moved_to_other_order(self):
+        product_in_order = ProductInOrder.objects.get(order=self.orders[0])
+        url = reverse(
+            'admin:foodcartapp_productinorder_change',
+            args=[product_in_order.pk],
+        )
+        data = get_form_data(self.client.get(url))
+        data['order'] = self.orders[1].pk
+
+        response = self.client.post(url, data)
+
+        self.assertEqual(response.status_code, 302)
+        self.assert_total_prices([Decimal('0'), Decimal('200')])
+
+    def test_order_lines_are_deleted_by_action(self):
+        response = self.client.post(
+            reverse('admin:foodcartapp_productinorder_changelist'),
+            {
+                'action': 'delete_selected',
+                'post': 'yes',
+                '_selected_action': ProductInOrder.objects.filter(
+                    order=self.orders[0]).values_list('pk', flat=True),
+            },
+        )
+
+        self.assertEqual(response.status_code, 302)
+        self.assert_total_prices([Decimal('0'), Decimal('100')])
+
+
+class CatalogCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_product_prices_reset_after_commit(self):
+        product = create_product(Decimal('500'))
+        get_available_product_prices()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product.price = Decimal('600')
+            product.save()
+            self.assertEqual(
+                get_available_product_prices(),
+                {product.pk: Decimal('500')},
+            )
+
+        self.assertEqual(
+            get_available_product_prices(),
+            {product.pk: Decimal('600')},
+        )
+
+    def test_product_list_etag(self):
+        product = create_product(Decimal('500'))
+        url = reverse('foodcartapp:product_list_api')
+        etag = self.client.get(url)['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product.price = Decimal('600')
+            product.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_availability_matrix_reset_after_commit(self):
+        product = create_product(Decimal('500'))
+        menu_item = RestaurantMenuItem.objects.get()
+        get_availability_matrix()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            menu_item.availability = False
+            menu_item.save()
+            self.assertEqual(
+                get_availability_matrix().get_availability(
+                    product.pk, [menu_item.restaurant_id]),
+                [True],
+            )
+
+        self.assertEqual(
+            get_availability_matrix().get_availability(
+                product.pk, [menu_item.restaurant_id]),
+            [False],
+        )
+
+
+class RestaurantIndexTest(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            reset_restaurant_index()
+
+    def test_location_is_updated_after_commit(self):
+        place = Place.objects.create(
+            address='Москва, Тверская улица, 1',
+            lat=55.7,
+            lon=37.6,
+            status='found',
+        )
+        old_index = get_restaurant_index()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            restaurant = Restaurant.objects.create(
+                name='Star Burger',
+                address=place.address,
+            )
+            self.assertIs(get_restaurant_index(), old_index)
+
+        self.assertEqual(len(old_index), 0)
+        self.assertEqual(
+            get_restaurant_index().nearest((55.7, 37.6)),
+            [(restaurant.pk, 0)],
+        )
+
+    def test_rolled_back_location_is_ignored(self):
+        place = Place.objects.create(
+            address='Москва, Тверская улица, 1',
+            lat=55.7,
+            lon=37.6,
+            status='found',
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(DatabaseError):
+                with transaction.atomic():
+                    Restaurant.objects.create(
+                        name='Star Burger',
+                        address=place.address,
+                    )
+                    raise DatabaseError
+            Restaurant.objects.create(name='Burger Star')
+
+        self.assertEqual(len(get_restaurant_index()), 0)
+
+
+class RestaurantCandidatesTest(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            restaurant = Restaurant.objects.create(
+                name='Star Burger',
+                address='Москва, Тверская улица, 1',
+            )
+        self.restaurant = Restaurant.objects.get(pk=restaurant.pk)
+
+    def test_rename_does_not_refresh_candidates(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.restaurant.name = 'Burger Star'
+            self.restaurant.save()
+        self.assertEqual(callbacks, [])
+
+    def test_address_change_refreshes_candidates(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.restaurant.address = 'Москва, Арбат, 1'
+            self.restaurant.save()
+        self.assertTrue(callbacks)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.restaurant.save()
+        self.assertEqual(callbacks, [])
+
+    def test_rolled_back_address_change_is_saved_again(self):
+        Place.objects.create(address='Москва, Арбат, 1')
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(DatabaseError):
+                with transaction.atomic():
+                    self.restaurant.address = 'Москва, Арбат, 1'
+                    self.restaurant.save()
+                    raise DatabaseError
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.restaurant.save()
+        self.assertTrue(callbacks)
+
+
+@override_settings(ORDER_SYNC_LAG=timedelta(0))
+class OrderChangesApiTest(TestCase):
+    def setUp(self):
+        self.client.force_login(
+            User.objects.create_user('manager', is_staff=True))
+        self.orders = [
+            Order.objects.create(
+                firstname=f'Клиент {number}',
+                phonenumber='+79991234567',
+                address='Москва, Тверская улица, 1',
+            )
+            for number in range(5)
+        ]
+
+    def get_changes(self, **params):
+        response = self.client.get(
+            reverse('foodcartapp:order_changes_api'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def get_all_changes(self, cursor=None):
+        orders_ids = []
+        while True:
+            params = {'limit': 2}
+            if cursor:
+                params['cursor'] = cursor
+            changes = self.get_changes(**params)
+            orders_ids.extend(order['id'] for order in changes['orders'])
+            cursor = changes['next_cursor']
+            if not changes['has_more']:
+                return orders_ids, cursor
+
+    def test_pages_cover_all_orders_once(self):
+        orders_ids, cursor = self.get_all_changes()
+        self.assertEqual(orders_ids, [order.pk for order in self.orders])
+
+        changed_order = self.orders[1]
+        changed_order.comment = 'Позвонить за час'
+        changed_order.save()
+
+        self.assertEqual(self.get_all_changes(cursor)[0], [changed_order.pk])
+
+    def test_imported_orders_are_passed(self):
+        _, cursor = self.get_all_changes()
+        order_data = next(iterate_orders())
+        order_data['products'] = []
+        # Кандидатов пересчитывают только новым заказам, а это тоже
+        # меняет ревизию
+        order_data['status'] = 'completed_order'
+
+        import_orders_batch([order_data], set(), set())
+
+        imported_order = Order.objects.latest('pk')
+        self.assertEqual(self.get_all_changes(cursor)[0], [imported_order.pk])
+
+    @override_settings(ORDER_SYNC_LAG=timedelta(minutes=5))
+    def test_recent_changes_are_hidden(self):
+        self.assertEqual(self.get_changes()['orders'], [])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(
+            reverse('foodcartapp:order_changes_api'), {'cursor': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
+
+class OrderWriterTest(TransactionTestCase):
+    def test_bad_order_fails_alone(self):
+        product = create_product(Decimal('500'))
+        batch = [
+            (get_order_data(product), Future()),
+            (get_order_data(product, quantity=1000), Future()),
+            (get_order_data(product), Future()),
+        ]
+
+        OrderWriter().write_batch(batch)
+
+        first, bad, last = [future for _, future in batch]
+        self.assertIsNotNone(bad.exception())
+        saved_orders = [first.result(), last.result()]
+        self.assertQuerysetEqual(
+            Order.objects.order_by('pk'),
+            saved_orders,
+        )
+        self.assertEqual(
+            [order.total_price for order in saved_orders],
+            [Decimal('500'), Decimal('500')],
+        )
+
+    def test_failed_commit_callback_does_not_duplicate_orders(self):
+        product = create_product(Decimal('500'))
+        batch = [(get_order_data(product), Future()) for _ in range(3)]
+
+        def fail_after_commit(orders_ids):
+            def fail():
+                raise RuntimeError
+            transaction.on_commit(fail)
+
+        with mock.patch(
+            'foodcartapp.order_intake.schedule_candidates_refresh',
+            fail_after_commit,
+        ):
+            OrderWriter().write_batch(batch)
+
+        saved_orders = [future.result() for _, future in batch]
+        self.assertQuerysetEqual(Order.objects.order_by('pk'), saved_orders)
+
+
+class RegisterOrderAsyncTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('foodcartapp:register_order_async')
+
+    def post_order(self, data):
+        return self.async_client.post(
+            self.url,
+            json.dumps(data),
+            content_type='application/json',
+        )
+
+    async def test_order_is_saved(self):
+        product = await sync_to_async(create_product)(Decimal('500'))
+        order_data = get_order_data(product)
+        del order_data['products'][0]['price']
+
+        response = await self.post_order(order_data)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        order = await sync_to_async(Order.objects.get)()
+        self.assertEqual(response.json()['id'], order.pk)
+        self.assertEqual(response.json()['firstname'], 'Иван')
+
+    async def test_invalid_order(self):
+        response = await self.post_order({'products': []})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('products', response.json())
+        self.assertFalse(await sync_to_async(Order.objects.exists)())
+
+
+class QueryBudgetTest(TestCase):
+    dataset = {
+        'restaurants': 3,
+        'products': 20,
+        'menu_density': 0.8,
+        'completed_orders': 20,
+        'pending_orders': 10,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('generate_dataset', seed=0, stdout=StringIO(),
+                     **cls.dataset)
+        cls.manager = User.objects.create_user('manager', is_staff=True)
+        cls.products = list(Product.objects.available()[:5])
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.manager)
+
+    def get(self, view_name, **extra):
+        with assert_query_budget(view_name):
+            response = self.client.get(reverse(view_name), **extra)
+        self.assertEqual(response.status_code, 200)
+
+    def test_view_orders(self):
+        self.get('restaurateur:view_orders')
+
+    def test_view_products(self):
+        self.get('restaurateur:ProductsView')
+
+    def test_product_list_api(self):
+        self.get(
+            'foodcartapp:product_list_api',
+            HTTP_ACCEPT_ENCODING='gzip, br',
+        )
+
+    def test_register_order(self):
+        with assert_query_budget('foodcartapp:register_order'):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    reverse('foodcartapp:register_order'),
+                    {
+                        'firstname': 'Иван',
+                        'lastname': 'Петров',
+                        'phonenumber': '+79991234567',
+                        'address': 'Москва, Тверская улица, 1',
+                        'products': [
+                            {'product': product.pk, 'quantity': 2}
+                            for product in self.products
+                        ],
+                    },
+                    content_type='application/json',
+                )
+        self.assertEqual(response.status_code, 200)
+
+
+class LargeDatasetQueryBudgetTest(QueryBudgetTest):
+    dataset = {
+        'restaurants': 10,
+        'products': 100,
+        'menu_density': 0.7,
+        'completed_orders': 200,
+        'pending_orders': 100,
+    }
@@ -1,12 +1,15 @@
 from django.urls import path
 
 from .views import product_list_api, banners_list_api, register_order
+from .views import order_changes_api, register_order_async
 
 
 app_name = "foodcartapp"
 
 urlpatterns = [
-    path('products/', product_list_api),
-    path('banners/', banners_list_api),
-    path('order/', register_order),
+    path('products/', product_list_api, name='product_list_api'),
+    path('banners/', banners_list_api, name='banners_list_api'),
+    path('order/', register_order, name='register_order'),
+    path('order/async/', register_order_async, name='register_order_async'),
+    path('orders/changes/', order_changes_api, name='order_changes_api'),
 ]
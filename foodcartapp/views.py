@@ -1,21 +1,30 @@
+import asyncio
+import hashlib
 import json
 
 import phonenumbers
-from django.db import transaction
-from django.http import JsonResponse
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError, transaction
+from django.http import HttpResponseNotAllowed
 from django.templatetags.static import static
 from rest_framework import status
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
 from rest_framework.serializers import Serializer, ModelSerializer
 from rest_framework.serializers import ValidationError
 from rest_framework.serializers import CharField, IntegerField
 from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 
+from .catalog import dump_products, get_available_product_prices
+from .catalog import get_product_list_content
 from .models import Product
-from .models import Order
-from .models import ProductInOrder
+from .models import Order, OrderIdempotencyKey
 from .models import RestaurantMenuItem
+from .order_intake import get_order_writer, save_orders
+from .order_sync import dump_order, encode_cursor, get_changed_orders
+from .renderers import is_pretty_json_requested, make_json_response
+from .renderers import render_json
 
 
 class ProductInOrderSerializer(Serializer):
@@ -31,18 +40,34 @@ class ProductInOrderSerializer(Serializer):
 class OrderSerializer(ModelSerializer):
     products = ProductInOrderSerializer(many=True, write_only=True)
 
+    def get_product_prices(self, products_ids):
+        return dict(
+            Product.objects.available()
+            .filter(pk__in=products_ids)
+            .values_list('pk', 'price')
+        )
+
     def validate_products(self, value):
         if not value:
             raise ValidationError(
                 'error: products: Список продуктов не может быть пустым.'
             )
-        elif not any(
-            Product.objects.filter(pk=product['product']) for product in value
-        ):
+
+        product_prices = self.get_product_prices(
+            {product['product'] for product in value}
+        )
+        if any(product['product'] not in product_prices for product in value):
             raise ValidationError(
                 'error: products: Недопустимый первичный ключ.'
             )
-        return value
+        return [
+            {
+                'product': product['product'],
+                'price': product_prices[product['product']],
+                'quantity': product['quantity'],
+            }
+            for product in value
+        ]
 
     class Meta:
         model = Order
@@ -54,7 +79,7 @@ class OrderSerializer(ModelSerializer):
             'lastname',
             'phonenumber',
             'address',
-            'comment'
+            'comment',
             'products',
         ]
 
@@ -66,9 +91,14 @@ class OrderSerializer(ModelSerializer):
             return value
 
 
+class CachedProductsOrderSerializer(OrderSerializer):
+    def get_product_prices(self, products_ids):
+        return get_available_product_prices()
+
+
 def banners_list_api(request):
     # FIXME move data to db?
-    return JsonResponse([
+    return render_json(request, [
         {
             'title': 'Burger',
             'src': static('burger.jpg'),
@@ -84,63 +114,146 @@ def banners_list_api(request):
             'src': static('tasty.jpg'),
             'text': 'Food is incomplete without a tasty dessert',
         }
-    ], safe=False, json_dumps_params={
-        'ensure_ascii': False,
-        'indent': 4,
-    })
+    ])
 
 
 def product_list_api(request):
-    products = Product.objects.select_related('category').available()
-
-    dumped_products = []
-    for product in products:
-        dumped_product = {
-            'id': product.id,
-            'name': product.name,
-            'price': product.price,
-            'special_status': product.special_status,
-            'description': product.description,
-            'category': {
-                'id': product.category.id,
-                'name': product.category.name,
-            } if product.category else None,
-            'image': product.image.url,
-            'restaurant': {
-                'id': product.id,
-                'name': product.name,
-            }
-        }
-        dumped_products.append(dumped_product)
-    return JsonResponse(dumped_products, safe=False, json_dumps_params={
-        'ensure_ascii': False,
-        'indent': 4,
+    if is_pretty_json_requested(request):
+        return render_json(request, dump_products())
+
+    content, compressed_content, etag = get_product_list_content()
+    return make_json_response(
+        request,
+        content,
+        compressed_content=compressed_content,
+        etag=etag,
+    )
+
+
+ORDER_CHANGES_PAGE_SIZE = 100
+ORDER_CHANGES_MAX_PAGE_SIZE = 1000
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def order_changes_api(request):
+    cursor = request.GET.get('cursor')
+    try:
+        limit = int(request.GET.get('limit', ORDER_CHANGES_PAGE_SIZE))
+        orders, has_more = get_changed_orders(
+            cursor,
+            min(max(limit, 1), ORDER_CHANGES_MAX_PAGE_SIZE),
+        )
+    except ValueError as error:
+        return Response(
+            {'error': str(error)},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    return render_json(request, {
+        'orders': [dump_order(order) for order in orders],
+        'next_cursor': encode_cursor(orders[-1]) if orders else cursor,
+        'has_more': has_more,
     })
 
 
-@transaction.atomic
+def create_order(order_data):
+    serializer = OrderSerializer(data=order_data)
+    if not serializer.is_valid():
+        return None, Response(
+            serializer.errors,
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    new_order, = save_orders([serializer.validated_data])
+    serializer = OrderSerializer(new_order)
+    return new_order, Response(serializer.data)
+
+
+def replay_order_response(idempotency_key, request_hash):
+    if idempotency_key.request_hash != request_hash:
+        return Response(
+            {'error': 'Idempotency-Key уже использован для другого заказа.'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    return Response(
+        idempotency_key.response_data,
+        status=idempotency_key.response_status,
+        headers={'Idempotent-Replayed': 'true'},
+    )
+
+
 @api_view(['POST'])
 def register_order(request):
-    new_order_data = request.data
+    key = request.headers.get('Idempotency-Key')
+    if not key:
+        _, response = create_order(request.data)
+        return response
 
-    serializer = OrderSerializer(data=new_order_data)
-    serializer.is_valid(raise_exception=True)
+    if len(key) > OrderIdempotencyKey._meta.get_field('key').max_length:
+        return Response(
+            {'error': 'Idempotency-Key слишком длинный.'},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    request_hash = hashlib.sha256(request.body).hexdigest()
 
-    new_order = Order.objects.create(
-        firstname=serializer.validated_data['firstname'],
-        lastname=serializer.validated_data['lastname'],
-        phonenumber=serializer.validated_data['phonenumber'],
-        address=serializer.validated_data['address'],
-    )
+    idempotency_key = OrderIdempotencyKey.objects.filter(key=key).first()
+    if idempotency_key and idempotency_key.is_expired():
+        idempotency_key.delete()
+    elif idempotency_key:
+        return replay_order_response(idempotency_key, request_hash)
 
-    for product in serializer.validated_data['products']:
-        product_in_order = Product.objects.get(pk=product['product'])
-        ProductInOrder.objects.create(
-            order=new_order,
-            product=product_in_order,
-            quantity=product['quantity'],
-            products_price=product_in_order.price * product['quantity']
+    try:
+        with transaction.atomic():
+            order, response = create_order(request.data)
+            if order is None:
+                # Ответ с ошибкой не запоминаем, иначе исправленный заказ
+                # с тем же ключом получил бы 422
+                return response
+            OrderIdempotencyKey.objects.create(
+                key=key,
+                request_hash=request_hash,
+                order=order,
+                response_status=response.status_code,
+                response_data=response.data,
+            )
+    except IntegrityError:
+        # Такой же запрос параллельно обработал другой воркер
+        idempotency_key = OrderIdempotencyKey.objects.filter(key=key).first()
+        if idempotency_key is None:
+            raise
+        return replay_order_response(idempotency_key, request_hash)
+    return response
+
+
+async def register_order_async(request):
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    if request.headers.get('Idempotency-Key'):
+        return await sync_to_async(register_order)(request)
+
+    try:
+        order_data = json.loads(request.body)
+    except ValueError:
+        return render_json(
+            request,
+            {'error': 'Тело запроса должно быть в формате JSON.'},
+            status=status.HTTP_400_BAD_REQUEST,
         )
 
-    serializer = OrderSerializer(new_order)
-    return Response(serializer.data)
+    serializer = CachedProductsOrderSerializer(data=order_data)
+    if not await sync_to_async(serializer.is_valid)():
+        return render_json(
+            request,
+            serializer.errors,
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    new_order = await asyncio.wrap_future(
+        get_order_writer().submit(serializer.validated_data)
+    )
+    return render_json(request, OrderSerializer(new_order).data)
+
+
+# csrf_exempt в Django 3.2 превращает корутину в синхронную функцию
+register_order_async.csrf_exempt = True
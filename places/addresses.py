@@ -0,0 +1,65 @@
+"""Приведение адресов к ключу, по которому ищутся одинаковые места.
+
+«ул. Ленина 5», «Ленина ул, 5» и «УЛ. ЛЕНИНА, д.5» дают один и тот же
+ключ «ленина 5 ул». Регистр, пробелы, знаки препинания и место слова
+«улица» не важны, сокращения приводятся к одному виду.
+"""
+import re
+
+
+PUNCTUATION = re.compile(r'[.,;:!?"\'«»()№#_]+')
+
+STREET_TYPES = {
+    'улица': 'ул',
+    'ул': 'ул',
+    'проспект': 'пр',
+    'просп': 'пр',
+    'пр-т': 'пр',
+    'пр-кт': 'пр',
+    'пр': 'пр',
+    'переулок': 'пер',
+    'пер': 'пер',
+    'шоссе': 'ш',
+    'ш': 'ш',
+    'площадь': 'пл',
+    'пл': 'пл',
+    'бульвар': 'б-р',
+    'бул': 'б-р',
+    'б-р': 'б-р',
+    'набережная': 'наб',
+    'наб': 'наб',
+    'проезд': 'пр-д',
+    'пр-д': 'пр-д',
+    'тупик': 'туп',
+    'туп': 'туп',
+    'аллея': 'ал',
+    'ал': 'ал',
+}
+ABBREVIATIONS = {
+    'корпус': 'к',
+    'корп': 'к',
+    'к': 'к',
+    'строение': 'стр',
+    'стр': 'стр',
+    'квартира': 'кв',
+    'кв': 'кв',
+}
+SKIPPED_WORDS = {'город', 'г', 'дом', 'д'}
+
+NORMALIZED_ADDRESS_MAX_LENGTH = 200
+
+
+def normalize_address(address):
+    words = PUNCTUATION.sub(' ', address.casefold().replace('ё', 'е')).split()
+    street_types = []
+    normalized_words = []
+    for word in words:
+        if word in SKIPPED_WORDS:
+            continue
+        if word in STREET_TYPES:
+            street_types.append(STREET_TYPES[word])
+            continue
+        normalized_words.append(ABBREVIATIONS.get(word, word))
+    return ' '.join(
+        normalized_words + sorted(street_types)
+    )[:NORMALIZED_ADDRESS_MAX_LENGTH]
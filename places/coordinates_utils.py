@@ -1,76 +1,150 @@
-import requests
-from geopy import distance
 from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
 
+from places.addresses import normalize_address
+from places.distances import calculate_distance_matrix
+from places.geocoder import get_geocoder
 from places.models import Place
+from star_burger.metrics import CACHE_REQUESTS
 
 
-def fetch_coordinates(apikey, address):
-    base_url = "https://geocode-maps.yandex.ru/1.x"
-    response = requests.get(base_url, params={
-        "geocode": address,
-        "apikey": apikey,
-        "format": "json",
-    })
-    response.raise_for_status()
-    found_places = response.json()['response']['GeoObjectCollection'][
-        'featureMember']
+def save_place_to_db(address, coordinates):
+    lat, lon = coordinates if coordinates else (None, None)
+    place, _ = Place.objects.update_or_create(
+        address=address,
+        defaults={
+            'normalized_address': normalize_address(address),
+            'lat': lat,
+            'lon': lon,
+            'status': 'found' if coordinates else 'not_found',
+            'created': timezone.now(),
+            'geocode_failed_at': None,
+        },
+    )
+    return place
 
-    if not found_places:
-        return None
 
-    most_relevant = found_places[0]
-    lon, lat = most_relevant['GeoObject']['Point']['pos'].split(" ")
-    return lat, lon
+def count_geocoder_cache_lookup(result):
+    CACHE_REQUESTS.labels('geocoder', result).inc()
 
 
-def save_new_place_to_db(address, coordinates):
-    new_place = Place.objects.create(
-        address=address,
-        lat=coordinates[0],
-        lon=coordinates[1],
-    ) if coordinates else None
+def get_place_coordinates(place):
+    if place is None or (place.status == 'pending' and not place.coordinates):
+        count_geocoder_cache_lookup('miss')
+        return None
 
-    return new_place
+    if place.status == 'not_found':
+        count_geocoder_cache_lookup('negative_hit')
+    else:
+        count_geocoder_cache_lookup('hit')
+    return place.coordinates
+
+
+def choose_main_place(places):
+    """Место с самыми свежими найденными координатами, иначе самое старое."""
+    found_places = [
+        place for place in places
+        if place.status == 'found' and place.coordinates
+    ]
+    if found_places:
+        return max(found_places, key=lambda place: place.created)
+    return min(places, key=lambda place: place.pk)
+
+
+def get_or_create_places(addresses):
+    """Возвращает места для адресов в виде словаря {адрес: место}.
+
+    Адреса, которые отличаются только написанием, получают одно и то же
+    место. Для новых адресов создаются места в очереди на геокодирование.
+    """
+    normalized_addresses = {
+        address: normalize_address(address) for address in addresses if address
+    }
+    places_by_address = {}
+    for place in Place.objects.filter(
+            normalized_address__in=set(normalized_addresses.values()),
+    ):
+        places_by_address.setdefault(place.normalized_address, []).append(place)
+    places = {
+        normalized_address: choose_main_place(same_places)
+        for normalized_address, same_places in places_by_address.items()
+    }
+
+    missing_addresses = {}
+    for address, normalized_address in normalized_addresses.items():
+        if normalized_address not in places:
+            missing_addresses.setdefault(normalized_address, address)
+    if missing_addresses:
+        Place.objects.bulk_create(
+            [
+                Place(
+                    address=address,
+                    normalized_address=normalized_address,
+                    status='pending',
+                )
+                for normalized_address, address in missing_addresses.items()
+            ],
+            ignore_conflicts=True,
+        )
+        created_places = Place.objects.in_bulk(
+            missing_addresses.values(),
+            field_name='address',
+        )
+        for normalized_address, address in missing_addresses.items():
+            places[normalized_address] = created_places[address]
 
+    return {
+        address: places[normalized_address]
+        for address, normalized_address in normalized_addresses.items()
+    }
 
-def calculate_delivery_distance(order_coordinates_by_addresses,
-                                restaurant_coordinates_by_addresses,
-                                start_point, end_points):
-    points_with_distance = []
-    restaurants = []
 
-    if start_point in order_coordinates_by_addresses.keys():
-        order_coordinates = order_coordinates_by_addresses[start_point]
-    else:
-        order_coordinates = fetch_coordinates(
-            settings.YANDEX_API_KEY, start_point)
-        if order_coordinates:
-            save_new_place_to_db(start_point, order_coordinates)
-
-    for end_point in end_points:
-        if end_point.address in restaurant_coordinates_by_addresses.keys():
-            end_point_coordinates = restaurant_coordinates_by_addresses[
-                end_point.address]
-        else:
-            end_point_coordinates = fetch_coordinates(
-                settings.YANDEX_API_KEY, end_point.address)
-            if end_point_coordinates:
-                save_new_place_to_db(end_point.address, end_point_coordinates)
-
-        restaurants.append((end_point.name, end_point_coordinates))
-
-    for restaurant_name, coordinates in restaurants:
-        if order_coordinates is None or end_point_coordinates is None:
-            delivery_distance = 'Адрес не определен'
-        else:
-            delivery_distance = round(distance.distance(
-                (end_point_coordinates[0], end_point_coordinates[1]),
-                (order_coordinates[0], order_coordinates[1]),
-            ).km, 2)
-
-        points_with_distance.append(
-            (restaurant_name, delivery_distance)
+def get_or_create_place(address):
+    if not address:
+        return None
+    return get_or_create_places([address])[address]
+
+
+def get_places_to_geocode(batch_size):
+    now = timezone.now()
+    return list(
+        Place.objects
+        .filter(
+            Q(status='pending')
+            | Q(status='found', created__lt=now - settings.GEOCODER_CACHE_TTL)
+            | Q(
+                status='not_found',
+                created__lt=now - settings.GEOCODER_NEGATIVE_CACHE_TTL,
+            )
         )
-
-    return points_with_distance
+        # Адреса, на которых геокодер ошибся, уходят в конец очереди
+        .order_by(F('geocode_failed_at').asc(nulls_first=True), 'created')
+        [:batch_size]
+    )
+
+
+def geocode_pending_places(batch_size):
+    pending_places = get_places_to_geocode(batch_size)
+    coordinates_by_address, errors_by_address = get_geocoder().fetch_many(
+        place.address for place in pending_places
+    )
+
+    if errors_by_address:
+        # created не трогаем, иначе устаревшие координаты считались бы
+        # свежими еще GEOCODER_CACHE_TTL
+        Place.objects.filter(
+            address__in=errors_by_address,
+        ).update(geocode_failed_at=timezone.now())
+
+    for address, coordinates in coordinates_by_address.items():
+        save_place_to_db(address, coordinates)
+    return len(pending_places), len(coordinates_by_address)
+
+
+def calculate_delivery_distance(start_places, end_places):
+    return calculate_distance_matrix(
+        [get_place_coordinates(place) for place in start_places],
+        [get_place_coordinates(place) for place in end_places],
+        mode=settings.DELIVERY_DISTANCE_MODE,
+    )
@@ -0,0 +1,85 @@
+"""Матрица расстояний между заказами и ресторанами за один проход NumPy.
+
+Точность относительно geodesic из geopy (эллипсоид WGS-84):
+
+- haversine — расстояние по сфере среднего радиуса. Ошибка не больше 0.6%
+  от расстояния, на городских расстояниях до 30 км это до 150 метров;
+- lambert — формула Ламберта для эллипсоида WGS-84. Ошибка не больше
+  10 метров на расстояниях до 5000 км, но растёт для почти
+  диаметрально противоположных точек.
+"""
+import numpy as np
+from django.core.exceptions import ImproperlyConfigured
+
+
+EARTH_MEAN_RADIUS_KM = 6371.0088
+WGS84_EQUATORIAL_RADIUS_KM = 6378.137
+WGS84_FLATTENING = 1 / 298.257223563
+
+
+def to_radians_array(coordinates):
+    points = np.array(
+        [point if point else (np.nan, np.nan) for point in coordinates],
+        dtype=float,
+    ).reshape(-1, 2)
+    return np.radians(points[:, 0]), np.radians(points[:, 1])
+
+
+def calculate_central_angle(lat1, lon1, lat2, lon2):
+    half_lat_delta = (lat2[np.newaxis, :] - lat1[:, np.newaxis]) / 2
+    half_lon_delta = (lon2[np.newaxis, :] - lon1[:, np.newaxis]) / 2
+    haversine = (
+        np.sin(half_lat_delta) ** 2
+        + np.cos(lat1)[:, np.newaxis] * np.cos(lat2)[np.newaxis, :]
+        * np.sin(half_lon_delta) ** 2
+    )
+    return 2 * np.arcsin(np.sqrt(np.clip(haversine, 0, 1)))
+
+
+def calculate_haversine_matrix(lat1, lon1, lat2, lon2):
+    return EARTH_MEAN_RADIUS_KM * calculate_central_angle(
+        lat1, lon1, lat2, lon2)
+
+
+def calculate_lambert_matrix(lat1, lon1, lat2, lon2):
+    reduced_lat1 = np.arctan((1 - WGS84_FLATTENING) * np.tan(lat1))
+    reduced_lat2 = np.arctan((1 - WGS84_FLATTENING) * np.tan(lat2))
+    sigma = calculate_central_angle(reduced_lat1, lon1, reduced_lat2, lon2)
+
+    p = (reduced_lat1[:, np.newaxis] + reduced_lat2[np.newaxis, :]) / 2
+    q = (reduced_lat2[np.newaxis, :] - reduced_lat1[:, np.newaxis]) / 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x = (
+            (sigma - np.sin(sigma)) * np.sin(p) ** 2 * np.cos(q) ** 2
+            / np.cos(sigma / 2) ** 2
+        )
+        y = (
+            (sigma + np.sin(sigma)) * np.cos(p) ** 2 * np.sin(q) ** 2
+            / np.sin(sigma / 2) ** 2
+        )
+        distances = WGS84_EQUATORIAL_RADIUS_KM * (
+            sigma - WGS84_FLATTENING / 2 * (x + y)
+        )
+    return np.where(sigma == 0, 0, distances)
+
+
+DISTANCE_MODES = {
+    'haversine': calculate_haversine_matrix,
+    'lambert': calculate_lambert_matrix,
+}
+
+
+def calculate_distance_matrix(origins, destinations, mode='haversine'):
+    """Возвращает матрицу расстояний в км размером origins × destinations.
+
+    Точки задаются парами (широта, долгота) в градусах. Вместо неизвестных
+    координат можно передать None, расстояние до них будет равно NaN.
+    """
+    if mode not in DISTANCE_MODES:
+        raise ImproperlyConfigured(
+            f'Неизвестный способ расчета расстояний: {mode}. '
+            f'Допустимые значения: {", ".join(DISTANCE_MODES)}'
+        )
+    lat1, lon1 = to_radians_array(origins)
+    lat2, lon2 = to_radians_array(destinations)
+    return DISTANCE_MODES[mode](lat1, lon1, lat2, lon2)
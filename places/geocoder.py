@@ -0,0 +1,287 @@
+import csv
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from requests.adapters import HTTPAdapter
+
+from places.addresses import STREET_TYPES, normalize_address
+from star_burger.metrics import GEOCODER_DURATION, GEOCODER_REQUESTS
+
+
+GEOCODER_ERRORS = (requests.RequestException, sqlite3.Error, KeyError, ValueError)
+
+
+class Geocoder:
+    """Общая часть геокодеров: пул потоков и метрики.
+
+    Одновременные запросы одного и того же адреса из разных потоков
+    склеиваются в один запрос. Наследники реализуют _request_coordinates.
+    """
+    name = None
+
+    def __init__(self, max_workers=8):
+        self.max_workers = max_workers
+        self._executor = None
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def request_coordinates(self, address):
+        started_at = time.perf_counter()
+        try:
+            coordinates = self._request_coordinates(address)
+        except Exception:
+            GEOCODER_REQUESTS.labels(self.name, 'error').inc()
+            raise
+        finally:
+            GEOCODER_DURATION.labels(self.name).observe(
+                time.perf_counter() - started_at)
+        GEOCODER_REQUESTS.labels(
+            self.name,
+            'found' if coordinates else 'not_found',
+        ).inc()
+        return coordinates
+
+    def _request_coordinates(self, address):
+        raise NotImplementedError
+
+    def fetch_coordinates(self, address):
+        with self._lock:
+            future = self._in_flight.get(address)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                self._in_flight[address] = future
+
+        if is_owner:
+            try:
+                future.set_result(self.request_coordinates(address))
+            except Exception as error:
+                future.set_exception(error)
+            finally:
+                with self._lock:
+                    del self._in_flight[address]
+        return future.result()
+
+    def fetch_many(self, addresses):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix='geocoder',
+                )
+        futures = {
+            address: self._executor.submit(self.fetch_coordinates, address)
+            for address in dict.fromkeys(addresses)
+        }
+
+        coordinates_by_address = {}
+        errors_by_address = {}
+        for address, future in futures.items():
+            try:
+                coordinates_by_address[address] = future.result()
+            except GEOCODER_ERRORS as error:
+                errors_by_address[address] = error
+        return coordinates_by_address, errors_by_address
+
+
+class YandexGeocoder(Geocoder):
+    """Клиент геокодера Яндекса с общим пулом соединений."""
+    name = 'yandex'
+
+    def __init__(self, apikey, base_url='https://geocode-maps.yandex.ru/1.x',
+                 connect_timeout=2, read_timeout=5, max_workers=8):
+        super().__init__(max_workers=max_workers)
+        if not apikey:
+            raise ImproperlyConfigured(
+                'Для геокодера Яндекса нужен YANDEX_API_KEY')
+        self.apikey = apikey
+        self.base_url = base_url
+        self.timeout = (connect_timeout, read_timeout)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=max_workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def _request_coordinates(self, address):
+        response = self.session.get(self.base_url, params={
+            'geocode': address,
+            'apikey': self.apikey,
+            'format': 'json',
+        }, timeout=self.timeout)
+        response.raise_for_status()
+        found_places = response.json()['response']['GeoObjectCollection'][
+            'featureMember']
+
+        if not found_places:
+            return None
+
+        most_relevant = found_places[0]
+        lon, lat = most_relevant['GeoObject']['Point']['pos'].split(' ')
+        return float(lat), float(lon)
+
+
+APARTMENT_WORDS = {
+    'кв', 'подъезд', 'под', 'этаж', 'эт', 'офис', 'оф', 'домофон', 'вход',
+}
+STREET_TYPE_WORDS = set(STREET_TYPES.values())
+
+
+def get_gazetteer_prefixes(key):
+    """Ключ адреса и он же без хвоста с квартирой, подъездом или этажом.
+
+    Ключ строится normalize_address. Самые длинные идут первыми:
+    «москва тверская 1 кв 5 ул» найдется по записи «москва тверская 1 ул»,
+    если точной записи в справочнике нет. Короче номера дома ключ
+    не обрезается.
+    """
+    words = key.split()
+    street_types_start = len(words)
+    while street_types_start and \
+            words[street_types_start - 1] in STREET_TYPE_WORDS:
+        street_types_start -= 1
+    street_types = words[street_types_start:]
+
+    prefixes = [key]
+    for position in range(street_types_start - 1, 0, -1):
+        if words[position] not in APARTMENT_WORDS:
+            continue
+        house = words[:position]
+        if not any(char.isdigit() for char in house[-1]):
+            continue
+        prefixes.append(' '.join(house + street_types))
+    return prefixes
+
+
+class GazetteerGeocoder(Geocoder):
+    """Геокодер по локальному справочнику адресов, без обращений к сети.
+
+    Справочник — CSV с колонками address, lat, lon, который целиком
+    загружается в память, или база SQLite с таблицей gazetteer(key,
+    address, lat, lon), где key — адрес после normalize_address.
+    Такие файлы создает команда export_gazetteer.
+    """
+    name = 'gazetteer'
+
+    def __init__(self, path, max_workers=8):
+        super().__init__(max_workers=max_workers)
+        if not path:
+            raise ImproperlyConfigured(
+                'Для геокодера gazetteer нужен GEOCODER_GAZETTEER_PATH')
+        self.path = path
+        self.coordinates_by_key = None
+        self._connections = threading.local()
+        if path.endswith('.csv'):
+            self.coordinates_by_key = self.load_csv(path)
+
+    @staticmethod
+    def load_csv(path):
+        with open(path, encoding='utf-8', newline='') as csv_file:
+            return {
+                normalize_address(row['address']):
+                    (float(row['lat']), float(row['lon']))
+                for row in csv.DictReader(csv_file)
+            }
+
+    def get_connection(self):
+        if not hasattr(self._connections, 'connection'):
+            self._connections.connection = sqlite3.connect(
+                f'file:{self.path}?mode=ro',
+                uri=True,
+            )
+        return self._connections.connection
+
+    def _request_coordinates(self, address):
+        prefixes = get_gazetteer_prefixes(normalize_address(address))
+        if self.coordinates_by_key is not None:
+            return next(
+                (
+                    self.coordinates_by_key[prefix] for prefix in prefixes
+                    if prefix in self.coordinates_by_key
+                ),
+                None,
+            )
+
+        found_place = self.get_connection().execute(
+            f'SELECT lat, lon FROM gazetteer '
+            f'WHERE key IN ({", ".join("?" * len(prefixes))}) '
+            f'ORDER BY length(key) DESC LIMIT 1',
+            prefixes,
+        ).fetchone()
+        return tuple(found_place) if found_place else None
+
+
+class ChainedGeocoder(Geocoder):
+    """Опрашивает геокодеры по очереди, пока один из них не найдет адрес.
+
+    Если никто не нашел адрес, но кто-то из геокодеров упал с ошибкой,
+    ошибка пробрасывается дальше, чтобы адрес не считался ненайденным.
+    """
+    name = 'chain'
+
+    def __init__(self, geocoders, max_workers=8):
+        super().__init__(max_workers=max_workers)
+        self.geocoders = geocoders
+
+    def request_coordinates(self, address):
+        # Метрики записывает каждый геокодер цепочки
+        return self._request_coordinates(address)
+
+    def _request_coordinates(self, address):
+        last_error = None
+        for geocoder in self.geocoders:
+            try:
+                coordinates = geocoder.request_coordinates(address)
+            except GEOCODER_ERRORS as error:
+                last_error = error
+                continue
+            if coordinates:
+                return coordinates
+        if last_error:
+            raise last_error
+        return None
+
+
+_geocoder = None
+_geocoder_lock = threading.Lock()
+
+
+def create_geocoder(name):
+    if name == 'yandex':
+        return YandexGeocoder(
+            settings.YANDEX_API_KEY,
+            base_url=settings.GEOCODER_URL,
+            connect_timeout=settings.GEOCODER_CONNECT_TIMEOUT,
+            read_timeout=settings.GEOCODER_READ_TIMEOUT,
+            max_workers=settings.GEOCODER_MAX_WORKERS,
+        )
+    if name == 'gazetteer':
+        return GazetteerGeocoder(
+            settings.GEOCODER_GAZETTEER_PATH,
+            max_workers=settings.GEOCODER_MAX_WORKERS,
+        )
+    raise ImproperlyConfigured(f'Неизвестный геокодер: {name}')
+
+
+def get_geocoder():
+    global _geocoder
+
+    with _geocoder_lock:
+        if _geocoder is None:
+            geocoders = [
+                create_geocoder(name.strip())
+                for name in settings.GEOCODER_BACKEND.split(',')
+            ]
+            if len(geocoders) == 1:
+                _geocoder, = geocoders
+            else:
+                _geocoder = ChainedGeocoder(
+                    geocoders,
+                    max_workers=settings.GEOCODER_MAX_WORKERS,
+                )
+    return _geocoder
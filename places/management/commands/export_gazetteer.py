@@ -0,0 +1,66 @@
+import csv
+import os
+import sqlite3
+
+from django.core.management.base import BaseCommand
+
+from places.addresses import normalize_address
+from places.models import Place
+
+
+class Command(BaseCommand):
+    help = (
+        'Сохраняет найденные координаты адресов в справочник для '
+        'геокодера gazetteer: CSV или базу SQLite'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'output',
+            help='Путь к файлу: .csv для CSV, иначе база SQLite',
+        )
+
+    def handle(self, *args, **options):
+        places = (
+            Place.objects
+            .filter(status='found', lat__isnull=False, lon__isnull=False)
+            .order_by('pk')
+            .values_list('address', 'lat', 'lon')
+            .iterator()
+        )
+        if options['output'].endswith('.csv'):
+            exported_count = self.export_csv(options['output'], places)
+        else:
+            exported_count = self.export_sqlite(options['output'], places)
+        self.stdout.write(f'Сохранено адресов: {exported_count}')
+
+    def export_csv(self, path, places):
+        exported_count = 0
+        with open(path, 'w', encoding='utf-8', newline='') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(['address', 'lat', 'lon'])
+            for place in places:
+                writer.writerow(place)
+                exported_count += 1
+        return exported_count
+
+    def export_sqlite(self, path, places):
+        if os.path.exists(path):
+            os.remove(path)
+        connection = sqlite3.connect(path)
+        with connection:
+            connection.execute(
+                'CREATE TABLE gazetteer '
+                '(key TEXT PRIMARY KEY, address TEXT, lat REAL, lon REAL)'
+            )
+            connection.executemany(
+                'INSERT OR REPLACE INTO gazetteer VALUES (?, ?, ?, ?)',
+                (
+                    (normalize_address(address), address, lat, lon)
+                    for address, lat, lon in places
+                ),
+            )
+            exported_count, = connection.execute(
+                'SELECT count(*) FROM gazetteer').fetchone()
+        connection.close()
+        return exported_count
@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand
+from prometheus_client import start_http_server
+
+from places.coordinates_utils import geocode_pending_places
+
+
+class Command(BaseCommand):
+    help = 'Определяет координаты адресов из очереди на геокодирование'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=20,
+            help='Сколько адресов геокодировать за один проход',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=5,
+            help='Пауза в секундах, если очередь пуста',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Обработать очередь один раз и завершиться',
+        )
+        parser.add_argument(
+            '--metrics-port',
+            type=int,
+            help='Порт, на котором отдавать метрики геокодера для Prometheus',
+        )
+
+    def handle(self, *args, **options):
+        if options['metrics_port']:
+            start_http_server(options['metrics_port'])
+        while True:
+            processed_count, geocoded_count = geocode_pending_places(
+                options['batch_size'])
+            if processed_count:
+                self.stdout.write(
+                    f'Геокодировано адресов: {geocoded_count} '
+                    f'из {processed_count}'
+                )
+
+            if options['once'] and processed_count < options['batch_size']:
+                break
+            if not geocoded_count:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
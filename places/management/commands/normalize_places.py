@@ -0,0 +1,101 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from foodcartapp.models import Order
+from foodcartapp.revisions import get_current_revision
+from places.addresses import normalize_address
+from places.coordinates_utils import choose_main_place
+from places.models import Place
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет нормализованные адреса мест и объединяет места, '
+        'адреса которых отличаются только написанием'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Сколько мест обновлять за один запрос',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Показать, какие места будут объединены, и откатить изменения',
+        )
+
+    def handle(self, *args, **options):
+        if not options['dry_run']:
+            self.normalize_places(options)
+            return
+
+        with transaction.atomic():
+            self.normalize_places(options)
+            transaction.set_rollback(True)
+
+    def normalize_places(self, options):
+        updated_count = self.fill_normalized_addresses(options['batch_size'])
+        self.stdout.write(f'Обновлено адресов: {updated_count}')
+
+        duplicated_addresses = (
+            Place.objects
+            .exclude(normalized_address='')
+            .values('normalized_address')
+            .annotate(places_count=Count('pk'))
+            .filter(places_count__gt=1)
+            .values_list('normalized_address', flat=True)
+        )
+        merged_count = 0
+        for normalized_address in list(duplicated_addresses):
+            places = list(
+                Place.objects.filter(normalized_address=normalized_address))
+            main_place = choose_main_place(places)
+            duplicates = [place for place in places if place != main_place]
+            self.stdout.write(
+                f'{main_place.address} <- '
+                f'{"; ".join(place.address for place in duplicates)}'
+            )
+            merge_places(main_place, duplicates)
+            merged_count += len(duplicates)
+        self.stdout.write(f'Объединено мест: {merged_count}')
+
+    def fill_normalized_addresses(self, batch_size):
+        updated_places = []
+        updated_count = 0
+        for place in Place.objects.only('pk', 'address', 'normalized_address') \
+                .order_by('pk').iterator(chunk_size=batch_size):
+            normalized_address = normalize_address(place.address)
+            if place.normalized_address == normalized_address:
+                continue
+            place.normalized_address = normalized_address
+            updated_places.append(place)
+            if len(updated_places) >= batch_size:
+                Place.objects.bulk_update(updated_places, ['normalized_address'])
+                updated_count += len(updated_places)
+                updated_places = []
+        Place.objects.bulk_update(updated_places, ['normalized_address'])
+        return updated_count + len(updated_places)
+
+
+@transaction.atomic
+def merge_places(main_place, duplicates):
+    for relation in Place._meta.related_objects:
+        changes = {relation.field.name: main_place}
+        if relation.related_model is Order:
+            # update() не трогает auto_now и ревизию, без них выгрузка
+            # изменений заказов не заметит смену места
+            changes.update(
+                updated_at=timezone.now(),
+                revision=get_current_revision(),
+            )
+        relation.related_model.objects.filter(
+            **{f'{relation.field.name}__in': duplicates},
+        ).update(**changes)
+    Place.objects.filter(pk__in=[place.pk for place in duplicates]).delete()
+    # Сохранение места пересчитывает рестораны-кандидаты его заказов
+    main_place.save()
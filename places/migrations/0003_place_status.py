@@ -0,0 +1,27 @@
+# Generated by Django 3.2 on 2026-10-18 05:27
+
+from django.db import migrations, models
+from django.db.models import Q
+
+
+def mark_not_found_places(apps, schema_editor):
+    Place = apps.get_model('places', 'Place')
+    Place.objects.filter(
+        Q(lat__isnull=True) | Q(lon__isnull=True)
+    ).update(status='not_found')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('places', '0002_rename_lot_place_lon'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='place',
+            name='status',
+            field=models.CharField(choices=[('found', 'найдено'), ('not_found', 'не найдено')], db_index=True, default='found', max_length=20, verbose_name='статус геокодирования'),
+        ),
+        migrations.RunPython(mark_not_found_places, migrations.RunPython.noop),
+    ]
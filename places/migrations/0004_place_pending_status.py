@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-18 05:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('places', '0003_place_status'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='place',
+            name='status',
+            field=models.CharField(choices=[('found', 'найдено'), ('not_found', 'не найдено'), ('pending', 'ожидает геокодирования')], db_index=True, default='found', max_length=20, verbose_name='статус геокодирования'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-18 06:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('places', '0004_place_pending_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='place',
+            name='normalized_address',
+            field=models.CharField(blank=True, db_index=True, max_length=200, verbose_name='нормализованный адрес'),
+        ),
+    ]
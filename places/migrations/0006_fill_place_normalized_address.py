@@ -0,0 +1,27 @@
+# Generated by Django 3.2 on 2026-10-18 07:00
+
+from django.db import migrations
+
+from places.addresses import normalize_address
+
+
+def fill_normalized_addresses(apps, schema_editor):
+    Place = apps.get_model('places', 'Place')
+
+    places = []
+    for place in Place.objects.filter(normalized_address='') \
+            .only('pk', 'address').iterator(chunk_size=2000):
+        place.normalized_address = normalize_address(place.address)
+        places.append(place)
+    Place.objects.bulk_update(places, ['normalized_address'], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('places', '0005_place_normalized_address'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_normalized_addresses, migrations.RunPython.noop),
+    ]
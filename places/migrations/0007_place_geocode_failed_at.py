@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-18 06:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('places', '0006_fill_place_normalized_address'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='place',
+            name='geocode_failed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='время последней ошибки геокодера'),
+        ),
+    ]
@@ -1,14 +1,29 @@
 from django.db import models
 from django.utils import timezone
 
+from .addresses import NORMALIZED_ADDRESS_MAX_LENGTH, normalize_address
+
 
 class Place(models.Model):
+    place_statuses = [
+        ('found', 'найдено'),
+        ('not_found', 'не найдено'),
+        ('pending', 'ожидает геокодирования'),
+    ]
+
     address = models.CharField(
         'адрес',
         unique=True,
         max_length=200,
     )
 
+    normalized_address = models.CharField(
+        'нормализованный адрес',
+        max_length=NORMALIZED_ADDRESS_MAX_LENGTH,
+        blank=True,
+        db_index=True,
+    )
+
     lat = models.FloatField(
         'широта',
         blank=True,
@@ -21,14 +36,38 @@ class Place(models.Model):
         null=True,
     )
 
+    status = models.CharField(
+        'статус геокодирования',
+        max_length=20,
+        choices=place_statuses,
+        default='found',
+        db_index=True,
+    )
+
     created = models.DateTimeField(
         'дата создания',
         default=timezone.now,
     )
 
+    geocode_failed_at = models.DateTimeField(
+        'время последней ошибки геокодера',
+        blank=True,
+        null=True,
+    )
+
     class Meta:
         verbose_name = 'место'
         verbose_name_plural = 'места'
 
     def __str__(self):
         return self.address
+
+    def save(self, *args, **kwargs):
+        self.normalized_address = normalize_address(self.address)
+        super().save(*args, **kwargs)
+
+    @property
+    def coordinates(self):
+        if self.lat is None or self.lon is None:
+            return None
+        return self.lat, self.lon
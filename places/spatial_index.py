@@ -0,0 +1,99 @@
+from collections import defaultdict
+from math import cos, floor, radians
+
+from places.distances import calculate_distance_matrix
+
+
+KM_PER_LATITUDE_DEGREE = 111.195
+
+
+class GeoGridIndex:
+    """Индекс точек на сетке из ячеек по широте и долготе.
+
+    Поиск ближайших точек в радиусе R проверяет только ячейки, которые
+    покрывают квадрат вокруг точки, а точные расстояния считает лишь
+    для попавших в них точек. Переход через 180-й меридиан не
+    поддерживается.
+    """
+
+    def __init__(self, cell_size_km=5):
+        self.cell_size = cell_size_km / KM_PER_LATITUDE_DEGREE
+        self.cells = defaultdict(dict)
+        self.points = {}
+
+    def __len__(self):
+        return len(self.points)
+
+    def copy(self):
+        index_copy = GeoGridIndex()
+        index_copy.cell_size = self.cell_size
+        index_copy.cells = defaultdict(dict, {
+            cell: dict(cell_points) for cell, cell_points in self.cells.items()
+        })
+        index_copy.points = dict(self.points)
+        return index_copy
+
+    def get_cell(self, lat, lon):
+        return floor(lat / self.cell_size), floor(lon / self.cell_size)
+
+    def add(self, key, coordinates):
+        self.remove(key)
+        lat, lon = float(coordinates[0]), float(coordinates[1])
+        cell = self.get_cell(lat, lon)
+        self.cells[cell][key] = (lat, lon)
+        self.points[key] = cell
+
+    def remove(self, key):
+        cell = self.points.pop(key, None)
+        if cell is None:
+            return
+        del self.cells[cell][key]
+        if not self.cells[cell]:
+            del self.cells[cell]
+
+    def get_points_near(self, lat, lon, radius_km):
+        lat_delta = radius_km / KM_PER_LATITUDE_DEGREE
+        min_cos = min(
+            cos(radians(min(abs(lat) + lat_delta, 89.9))),
+            cos(radians(abs(lat))),
+        )
+        lon_delta = min(lat_delta / max(min_cos, 1e-3), 180)
+
+        min_row, min_column = self.get_cell(lat - lat_delta, lon - lon_delta)
+        max_row, max_column = self.get_cell(lat + lat_delta, lon + lon_delta)
+        if (max_row - min_row + 1) * (max_column - min_column + 1) > len(
+                self.cells):
+            return [
+                (key, point) for cell_points in self.cells.values()
+                for key, point in cell_points.items()
+            ]
+
+        points = []
+        for row in range(min_row, max_row + 1):
+            for column in range(min_column, max_column + 1):
+                points.extend(self.cells.get((row, column), {}).items())
+        return points
+
+    def nearest(self, coordinates, k=None, radius_km=None):
+        lat, lon = float(coordinates[0]), float(coordinates[1])
+        if radius_km is None:
+            points = [
+                (key, point) for cell_points in self.cells.values()
+                for key, point in cell_points.items()
+            ]
+        else:
+            points = self.get_points_near(lat, lon, radius_km)
+        if not points:
+            return []
+
+        distances = calculate_distance_matrix(
+            [(lat, lon)], [point for _, point in points])[0]
+        nearest_points = sorted(
+            (
+                (key, float(distance))
+                for (key, _), distance in zip(points, distances)
+                if radius_km is None or distance <= radius_km
+            ),
+            key=lambda point: point[1],
+        )
+        return nearest_points[:k] if k else nearest_points
@@ -1,3 +1,223 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
 
-# Create your tests here.
+import requests
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from .coordinates_utils import geocode_pending_places, get_or_create_places
+from .distances import calculate_distance_matrix
+from .geocoder import GazetteerGeocoder, YandexGeocoder
+from .geocoder import get_gazetteer_prefixes
+from .models import Place
+
+
+class GeocoderRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        address = parse_qs(urlparse(self.path).query)['geocode'][0]
+        self.server.requests.append((self.client_address, address))
+        if address == 'медленный адрес':
+            time.sleep(1)
+        self.server.wait_for_release(address)
+
+        content = json.dumps({'response': {'GeoObjectCollection': {
+            'featureMember': [
+                {'GeoObject': {'Point': {'pos': '37.6 55.7'}}},
+            ],
+        }}}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class GeocoderServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), GeocoderRequestHandler)
+        self.requests = []
+        self.held_address = None
+        self.request_received = threading.Event()
+        self.release = threading.Event()
+
+    def handle_error(self, request, client_address):
+        # Клиент закрывает соединение, не дождавшись медленного ответа
+        pass
+
+    def wait_for_release(self, address):
+        if address == self.held_address:
+            self.request_received.set()
+            self.release.wait(5)
+
+
+class YandexGeocoderTest(SimpleTestCase):
+    def setUp(self):
+        self.server = GeocoderServer()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        host, port = self.server.server_address
+        self.geocoder = YandexGeocoder(
+            'key',
+            base_url=f'http://{host}:{port}/1.x',
+            connect_timeout=1,
+            read_timeout=0.2,
+        )
+        self.addCleanup(self.geocoder.session.close)
+
+    def test_read_timeout(self):
+        with self.assertRaises(requests.Timeout):
+            self.geocoder.fetch_coordinates('медленный адрес')
+
+    def test_connection_is_reused(self):
+        addresses = [f'Москва, Тверская улица, {number}' for number in range(5)]
+        for address in addresses:
+            self.assertEqual(
+                self.geocoder.fetch_coordinates(address), (55.7, 37.6))
+
+        self.assertEqual(
+            [address for _, address in self.server.requests], addresses)
+        clients = {client for client, _ in self.server.requests}
+        self.assertEqual(len(clients), 1)
+
+    def test_same_address_requests_are_merged(self):
+        address = 'Москва, Тверская улица, 1'
+        self.server.held_address = address
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    self.geocoder.fetch_coordinates(address)),
+            )
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        self.assertTrue(self.server.request_received.wait(5))
+        time.sleep(0.1)
+        self.server.release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(results, [(55.7, 37.6)] * 5)
+        self.assertEqual(len(self.server.requests), 1)
+
+
+class GazetteerGeocoderTest(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'gazetteer.csv')
+        with open(self.path, 'w', encoding='utf-8', newline='') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(['address', 'lat', 'lon'])
+            writer.writerow(['Москва, Тверская улица, 1', 55.7, 37.6])
+            writer.writerow(['Москва, Тверская улица', 55.8, 37.7])
+
+    def test_prefixes_drop_only_apartment_parts(self):
+        self.assertEqual(
+            get_gazetteer_prefixes('москва тверская 1 кв 5 подъезд 2 ул'),
+            [
+                'москва тверская 1 кв 5 подъезд 2 ул',
+                'москва тверская 1 кв 5 ул',
+                'москва тверская 1 ул',
+            ],
+        )
+        self.assertEqual(
+            get_gazetteer_prefixes('москва тверская 1 ул'),
+            ['москва тверская 1 ул'],
+        )
+
+    def test_spelling_variants_are_found(self):
+        geocoder = GazetteerGeocoder(self.path)
+        self.assertEqual(
+            geocoder.fetch_coordinates('москва, ул. Тверская, д. 1, кв. 5'),
+            (55.7, 37.6),
+        )
+
+    def test_street_without_house_is_not_found(self):
+        geocoder = GazetteerGeocoder(self.path)
+        self.assertIsNone(geocoder.fetch_coordinates('Москва, Тверская улица, 2'))
+
+
+class GetOrCreatePlacesTest(TestCase):
+    def test_freshest_found_duplicate_is_used(self):
+        now = timezone.now()
+        Place.objects.create(address='ул. Ленина 5', status='pending')
+        found_place = Place.objects.create(
+            address='Ленина ул, 5',
+            lat=55.7,
+            lon=37.6,
+            status='found',
+            created=now - timedelta(days=1),
+        )
+        Place.objects.create(
+            address='улица Ленина, 5',
+            lat=55.8,
+            lon=37.7,
+            status='found',
+            created=now - timedelta(days=2),
+        )
+
+        places = get_or_create_places(['УЛ. ЛЕНИНА, д.5'])
+
+        self.assertEqual(places, {'УЛ. ЛЕНИНА, д.5': found_place})
+
+
+class GeocodePendingPlacesTest(TestCase):
+    def test_failed_refresh_keeps_created(self):
+        created = timezone.now() - timedelta(days=60)
+        expired_place = Place.objects.create(
+            address='Москва, Тверская улица, 1',
+            lat=55.7,
+            lon=37.6,
+            status='found',
+            created=created,
+        )
+        pending_place = Place.objects.create(
+            address='Москва, Арбат, 1',
+            status='pending',
+        )
+        geocoder = mock.Mock()
+        geocoder.fetch_many.return_value = (
+            {},
+            {expired_place.address: requests.Timeout()},
+        )
+
+        with mock.patch(
+                'places.coordinates_utils.get_geocoder', return_value=geocoder):
+            geocode_pending_places(batch_size=10)
+            geocode_pending_places(batch_size=1)
+
+        expired_place.refresh_from_db()
+        self.assertEqual(expired_place.created, created)
+        self.assertIsNotNone(expired_place.geocode_failed_at)
+        # Адрес с ошибкой не занимает очередь перед остальными
+        self.assertEqual(
+            list(geocoder.fetch_many.call_args.args[0]),
+            [pending_place.address],
+        )
+
+
+class DistanceMatrixTest(SimpleTestCase):
+    def test_unknown_mode(self):
+        with self.assertRaisesMessage(
+                ImproperlyConfigured, 'Допустимые значения: haversine, lambert'):
+            calculate_distance_matrix([(55.7, 37.6)], [(55.8, 37.7)], 'flat')
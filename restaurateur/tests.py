@@ -1,3 +1,94 @@
-from django.test import TestCase
+import asyncio
+import time
+from datetime import timedelta
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+
+from foodcartapp.models import Order
+from restaurateur.views import get_last_order_change_cursor
+
+
+def create_order():
+    return Order.objects.create(
+        firstname='Иван',
+        phonenumber='+79991234567',
+        address='Москва, Тверская улица, 1',
+    )
+
+
+@override_settings(
+    ORDER_FEED_TIMEOUT=10,
+    ORDER_FEED_POLL_INTERVAL=10,
+    ORDER_SYNC_LAG=timedelta(0),
+)
+class OrderChangesTest(TransactionTestCase):
+    def setUp(self):
+        manager = User.objects.create_user('manager', is_staff=True)
+        self.client.force_login(manager)
+        self.async_client.force_login(manager)
+        self.url = reverse('restaurateur:order_changes')
+
+    async def test_long_poll_returns_new_order_before_timeout(self):
+        cursor = await sync_to_async(get_last_order_change_cursor)()
+
+        async def create_order_later():
+            await asyncio.sleep(0.5)
+            return await sync_to_async(create_order)()
+
+        started_at = time.monotonic()
+        order_task = asyncio.ensure_future(create_order_later())
+        response = await self.async_client.get(
+            f'{self.url}?after={cursor}')
+        elapsed = time.monotonic() - started_at
+        order = await order_task
+
+        self.assertEqual(response.status_code, 200)
+        self.assertLess(elapsed, 5)
+        changes = response.json()
+        self.assertEqual(
+            [change['id'] for change in changes['orders']], [order.pk])
+        self.assertIn('data-order-id', changes['orders'][0]['html'])
+        self.assertEqual(changes['retry_ms'], 0)
+
+    def test_short_poll_under_wsgi(self):
+        create_order()
+        cursor = get_last_order_change_cursor()
+
+        started_at = time.monotonic()
+        response = self.client.get(self.url, {'after': cursor})
+        elapsed = time.monotonic() - started_at
+
+        self.assertEqual(response.status_code, 200)
+        self.assertLess(elapsed, 5)
+        self.assertEqual(
+            response.json(),
+            {'cursor': cursor, 'orders': [], 'retry_ms': 10000},
+        )
+
+        order = create_order()
+        changes = self.client.get(self.url, {'after': cursor}).json()
+        self.assertEqual(
+            [change['id'] for change in changes['orders']], [order.pk])
+        self.assertNotEqual(changes['cursor'], cursor)
+
+    def test_unfinished_transactions_are_not_passed(self):
+        cursor = get_last_order_change_cursor()
+        with override_settings(ORDER_SYNC_LAG=timedelta(minutes=5)):
+            hidden_order = create_order()
+            changes = self.client.get(self.url, {'after': cursor}).json()
+            self.assertEqual(changes['orders'], [])
+            self.assertEqual(changes['cursor'], cursor)
+
+        order = create_order()
+        changes = self.client.get(self.url, {'after': cursor}).json()
+        self.assertEqual(
+            [change['id'] for change in changes['orders']],
+            [hidden_order.pk, order.pk],
+        )
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {'after': '1'})
+        self.assertEqual(response.status_code, 400)
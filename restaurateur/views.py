@@ -1,14 +1,28 @@
+import time
+
+from asgiref.sync import sync_to_async
 from django import forms
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.paginator import Paginator
+from django.http import HttpResponseBadRequest, HttpResponseForbidden
+from django.http import JsonResponse
+from django.db.models import Q
 from django.shortcuts import redirect, render
+from django.template.loader import render_to_string
 from django.views import View
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.contrib.auth.decorators import user_passes_test
 
 from django.contrib.auth import authenticate, login
 from django.contrib.auth import views as auth_views
 
 
-from foodcartapp.models import Product, Restaurant, Order
+from foodcartapp.catalog import get_availability_matrix
+from foodcartapp.models import Product, Restaurant, Order, OrderChange
+from foodcartapp.order_feed import get_order_feed_broker
+from foodcartapp.order_sync import decode_cursor, encode_cursor
+from foodcartapp.revisions import get_visible_revision
 
 
 class Login(forms.Form):
@@ -66,25 +80,30 @@ def is_manager(user):
 @user_passes_test(is_manager, login_url='restaurateur:login')
 def view_products(request):
     restaurants = list(Restaurant.objects.order_by('name'))
-    products = list(Product.objects.prefetch_related('menu_items'))
-
-    default_availability = {restaurant.id: False for restaurant in restaurants}
-    products_with_restaurants = []
-    for product in products:
-
-        availability = {
-            **default_availability,
-            **{item.restaurant_id: item.availability for item in product.menu_items.all()},
-        }
-        orderer_availability = [availability[restaurant.id] for restaurant in restaurants]
-
-        products_with_restaurants.append(
-            (product, orderer_availability)
+    products = Product.objects.select_related('category').order_by('pk')
+
+    page = None
+    if settings.MANAGER_PRODUCTS_PER_PAGE:
+        page = Paginator(
+            products,
+            settings.MANAGER_PRODUCTS_PER_PAGE,
+        ).get_page(request.GET.get('page'))
+        products = page.object_list
+
+    availability_matrix = get_availability_matrix()
+    restaurants_ids = [restaurant.id for restaurant in restaurants]
+    products_with_restaurants = [
+        (
+            product,
+            availability_matrix.get_availability(product.id, restaurants_ids),
         )
+        for product in products
+    ]
 
     return render(request, template_name="products_list.html", context={
         'products_with_restaurants': products_with_restaurants,
         'restaurants': restaurants,
+        'page': page,
     })
 
 
@@ -96,11 +115,108 @@ def view_restaurants(request):
     })
 
 
+def get_visible_order_changes():
+    """Журнал без изменений из транзакций, которые могут быть еще не закрыты.
+
+    Иначе такое изменение оказалось бы позади курсора страницы и страница
+    его бы не увидела. Подробнее в модуле foodcartapp.revisions.
+    """
+    return (
+        OrderChange.objects
+        .filter(revision__lt=get_visible_revision())
+        .order_by('revision', 'pk')
+    )
+
+
+def get_last_order_change_cursor():
+    last_change = get_visible_order_changes().only('revision').last()
+    return encode_cursor(last_change) if last_change else ''
+
+
+def get_order_changes(cursor, limit=100):
+    changes = get_visible_order_changes()
+    if cursor:
+        revision, change_id = decode_cursor(cursor)
+        changes = changes.filter(
+            Q(revision__gt=revision)
+            | Q(revision=revision, pk__gt=change_id)
+        )
+    changes = list(changes.only('revision', 'order_id')[:limit])
+    if not changes:
+        return cursor, []
+
+    orders_ids = sorted({change.order_id for change in changes})
+    next_url = reverse('restaurateur:view_orders')
+    rendered_orders = {
+        order.pk: render_to_string('order_item_row.html', {
+            'item': order,
+            'next_url': next_url,
+        })
+        for order in Order.objects
+            .filter(pk__in=orders_ids, status='new_order')
+            .select_related('restaurant')
+            .get_available_restaurants()
+    }
+    return encode_cursor(changes[-1]), [
+        {'id': order_id, 'html': rendered_orders.get(order_id)}
+        for order_id in orders_ids
+    ]
+
+
 @user_passes_test(is_manager, login_url='restaurateur:login')
 def view_orders(request):
+    cursor = get_last_order_change_cursor()
     return render(request, template_name='order_items.html', context={
         'order_items': Order.objects.filter(status='new_order')
             .select_related('restaurant')
-            .calculate_order_price()
             .get_available_restaurants(),
+        'cursor': cursor,
+        'next_url': request.get_full_path(),
     })
+
+
+async def view_order_changes(request):
+    """Long polling: отвечает, как только в журнале появятся изменения.
+
+    Для каждого измененного заказа отдает готовую строку таблицы или
+    null, если заказ удален или уже не нужно показывать.
+
+    Ждать изменений имеет смысл только под ASGI. Под WSGI ожидание занимало
+    бы синхронный воркер целиком, поэтому view отвечает сразу, а в retry_ms
+    подсказывает странице, через сколько повторить запрос.
+    """
+    if not await sync_to_async(is_manager)(request.user):
+        return HttpResponseForbidden()
+    cursor = request.GET.get('after', '')
+    try:
+        if cursor:
+            decode_cursor(cursor)
+    except ValueError:
+        return HttpResponseBadRequest()
+
+    broker = get_order_feed_broker()
+    if isinstance(request, ASGIRequest):
+        timeout, retry_ms = settings.ORDER_FEED_TIMEOUT, 0
+    else:
+        timeout = 0
+        retry_ms = int(settings.ORDER_FEED_POLL_INTERVAL * 1000)
+    deadline = time.monotonic() + timeout
+    while True:
+        version = broker.version
+        next_cursor, orders = await sync_to_async(get_order_changes)(cursor)
+        remaining = deadline - time.monotonic()
+        if orders or remaining <= 0:
+            break
+        await sync_to_async(broker.wait, thread_sensitive=False)(
+            version,
+            min(remaining, settings.ORDER_FEED_POLL_INTERVAL),
+        )
+
+    return JsonResponse(
+        {
+            'cursor': next_cursor,
+            'orders': orders,
+            'retry_ms': retry_ms,
+        },
+        json_dumps_params={'ensure_ascii': False},
+    )
@@ -0,0 +1,109 @@
+import asyncio
+import os
+import time
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY
+from prometheus_client import CollectorRegistry, Counter, Histogram
+from prometheus_client import generate_latest, multiprocess
+
+from .query_budget import count_queries
+
+
+VIEW_DURATION = Histogram(
+    'star_burger_view_duration_seconds',
+    'Время ответа view',
+    ['view', 'method', 'status'],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+VIEW_DB_QUERIES = Histogram(
+    'star_burger_view_db_queries',
+    'Число SQL-запросов за один запрос к view',
+    ['view'],
+    buckets=(1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144, 233),
+)
+VIEW_DB_DURATION = Histogram(
+    'star_burger_view_db_duration_seconds',
+    'Время, проведенное view в базе данных',
+    ['view'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+GEOCODER_REQUESTS = Counter(
+    'star_burger_geocoder_requests_total',
+    'Запросы к геокодеру',
+    ['backend', 'outcome'],
+)
+GEOCODER_DURATION = Histogram(
+    'star_burger_geocoder_request_duration_seconds',
+    'Время ответа геокодера',
+    ['backend'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+CACHE_REQUESTS = Counter(
+    'star_burger_cache_requests_total',
+    'Обращения к кэшам: попадания и промахи',
+    ['cache', 'result'],
+)
+
+
+def get_view_name(request):
+    if request.resolver_match:
+        return request.resolver_match.view_name
+    return 'unmatched'
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+
+        started_at = time.perf_counter()
+        with count_queries() as counter:
+            response = self.get_response(request)
+        duration = time.perf_counter() - started_at
+
+        view_name = get_view_name(request)
+        VIEW_DURATION.labels(
+            view_name, request.method, response.status_code).observe(duration)
+        VIEW_DB_QUERIES.labels(view_name).observe(counter.queries)
+        VIEW_DB_DURATION.labels(view_name).observe(counter.db_time)
+        return response
+
+    async def __acall__(self, request):
+        # Под ASGI запросы к базе идут из других потоков, поэтому
+        # записывается только время ответа
+        started_at = time.perf_counter()
+        response = await self.get_response(request)
+        VIEW_DURATION.labels(
+            get_view_name(request),
+            request.method,
+            response.status_code,
+        ).observe(time.perf_counter() - started_at)
+        return response
+
+
+def get_metrics_registry():
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def metrics_view(request):
+    if settings.METRICS_TOKEN and request.META.get(
+            'HTTP_AUTHORIZATION') != f'Bearer {settings.METRICS_TOKEN}':
+        return HttpResponseForbidden()
+    return HttpResponse(
+        generate_latest(get_metrics_registry()),
+        content_type=CONTENT_TYPE_LATEST,
+    )
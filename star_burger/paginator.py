@@ -0,0 +1,40 @@
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+def get_estimated_count(queryset):
+    """Оценка числа строк по статистике PostgreSQL вместо COUNT(*).
+
+    Работает только для запросов без фильтров: для остальных и для других
+    баз данных возвращает None.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql' or queryset.query.where:
+        return None
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+            [queryset.model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    if not row or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор для больших таблиц в админке.
+
+    Таблицы меньше exact_count_threshold строк по-прежнему считаются точно.
+    """
+    exact_count_threshold = 10000
+
+    @cached_property
+    def count(self):
+        estimated_count = get_estimated_count(self.object_list)
+        if estimated_count is None or \
+                estimated_count < self.exact_count_threshold:
+            return super().count
+        return estimated_count
@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+
+import rollbar
+from django.conf import settings
+from django.db import connection
+
+
+logger = logging.getLogger(__name__)
+
+
+class QueryCounter:
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started_at = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - started_at
+
+    @property
+    def db_time_ms(self):
+        return self.db_time * 1000
+
+
+@contextmanager
+def count_queries():
+    counter = QueryCounter()
+    with connection.execute_wrapper(counter):
+        yield counter
+
+
+def get_query_budget(view_name):
+    return settings.QUERY_BUDGETS.get(view_name)
+
+
+def get_budget_violations(view_name, counter):
+    budget = get_query_budget(view_name)
+    if not budget:
+        return []
+
+    violations = []
+    if counter.queries > budget.get('queries', float('inf')):
+        violations.append(
+            f'{counter.queries} SQL-запросов при лимите {budget["queries"]}')
+    if counter.db_time_ms > budget.get('db_time_ms', float('inf')):
+        violations.append(
+            f'{counter.db_time_ms:.1f} мс в базе '
+            f'при лимите {budget["db_time_ms"]} мс'
+        )
+    return violations
+
+
+@contextmanager
+def assert_query_budget(view_name):
+    """Падает с AssertionError, если код внутри блока превысил лимиты view."""
+    with count_queries() as counter:
+        yield counter
+    violations = get_budget_violations(view_name, counter)
+    assert not violations, f'{view_name}: {", ".join(violations)}'
+
+
+class QueryBudgetMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            # Под ASGI запросы к базе идут из других потоков, их не посчитать
+            return self.get_response(request)
+
+        with count_queries() as counter:
+            response = self.get_response(request)
+
+        if request.resolver_match:
+            view_name = request.resolver_match.view_name
+            violations = get_budget_violations(view_name, counter)
+            if violations:
+                message = (
+                    f'{view_name} превысил бюджет запросов к базе: '
+                    f'{", ".join(violations)}'
+                )
+                logger.warning(message)
+                if settings.QUERY_BUDGET_REPORT_TO_ROLLBAR:
+                    rollbar.report_message(message, 'warning', request)
+        return response
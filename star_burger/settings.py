@@ -1,4 +1,5 @@
 import os
+from datetime import timedelta
 
 import dj_database_url
 
@@ -34,23 +35,27 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    'debug_toolbar',
     'phonenumber_field',
     'rest_framework',
 ]
 
 MIDDLEWARE = [
+    'star_burger.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'star_burger.query_budget.QueryBudgetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
     'rollbar.contrib.django.middleware.RollbarNotifierMiddlewareExcluding404',
 ]
 
+if DEBUG:
+    INSTALLED_APPS.append('debug_toolbar')
+    MIDDLEWARE.insert(-1, 'debug_toolbar.middleware.DebugToolbarMiddleware')
+
 ROOT_URLCONF = 'star_burger.urls'
 
 DEBUG_TOOLBAR_PANELS = [
@@ -95,6 +100,57 @@ DATABASES = {
     'default': dj_database_url.config()
 }
 
+CACHES = {
+    'default': env.dj_cache_url('CACHE_URL', 'locmem://'),
+}
+
+PRODUCT_LIST_CACHE_TIMEOUT = env.int('PRODUCT_LIST_CACHE_TIMEOUT', 60 * 60)
+MANAGER_PRODUCTS_PER_PAGE = env.int('MANAGER_PRODUCTS_PER_PAGE', 0)
+
+ORDER_IDEMPOTENCY_KEY_TTL = timedelta(
+    hours=env.int('ORDER_IDEMPOTENCY_KEY_TTL_HOURS', 24)
+)
+ORDER_WRITER_BATCH_SIZE = env.int('ORDER_WRITER_BATCH_SIZE', 20)
+ORDER_WRITER_MAX_DELAY_MS = env.float('ORDER_WRITER_MAX_DELAY_MS', 10)
+ORDER_FEED_TIMEOUT = env.float('ORDER_FEED_TIMEOUT', 25)
+ORDER_FEED_POLL_INTERVAL = env.float('ORDER_FEED_POLL_INTERVAL', 2)
+ORDER_CHANGES_TTL = timedelta(hours=env.int('ORDER_CHANGES_TTL_HOURS', 24))
+ORDER_SYNC_LAG = timedelta(seconds=env.float('ORDER_SYNC_LAG_SECONDS', 5))
+
+QUERY_BUDGETS = {
+    'restaurateur:view_orders': {'queries': 6, 'db_time_ms': 500},
+    'restaurateur:ProductsView': {'queries': 6, 'db_time_ms': 500},
+    'foodcartapp:product_list_api': {'queries': 4, 'db_time_ms': 200},
+    'foodcartapp:register_order': {'queries': 22, 'db_time_ms': 200},
+    'foodcartapp:order_changes_api': {'queries': 6, 'db_time_ms': 500},
+}
+QUERY_BUDGET_REPORT_TO_ROLLBAR = (
+    env.bool('ROLLBAR_ENABLE', False)
+    and env.bool('QUERY_BUDGET_REPORT_TO_ROLLBAR', False)
+)
+
+METRICS_TOKEN = env.str('METRICS_TOKEN', '')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'star_burger': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+        'foodcartapp': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+    },
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -132,4 +188,20 @@ STATICFILES_DIRS = [
     os.path.join(BASE_DIR, "bundles"),
 ]
 
-YANDEX_API_KEY = env('YANDEX_API_KEY')
+YANDEX_API_KEY = env.str('YANDEX_API_KEY', '')
+
+GEOCODER_BACKEND = env.str('GEOCODER_BACKEND', 'yandex')
+GEOCODER_GAZETTEER_PATH = env.str('GEOCODER_GAZETTEER_PATH', '')
+GEOCODER_URL = env.str('GEOCODER_URL', 'https://geocode-maps.yandex.ru/1.x')
+GEOCODER_CONNECT_TIMEOUT = env.float('GEOCODER_CONNECT_TIMEOUT', 2)
+GEOCODER_READ_TIMEOUT = env.float('GEOCODER_READ_TIMEOUT', 5)
+GEOCODER_MAX_WORKERS = env.int('GEOCODER_MAX_WORKERS', 8)
+
+GEOCODER_CACHE_TTL = timedelta(days=env.int('GEOCODER_CACHE_TTL_DAYS', 30))
+GEOCODER_NEGATIVE_CACHE_TTL = timedelta(
+    hours=env.int('GEOCODER_NEGATIVE_CACHE_TTL_HOURS', 24)
+)
+
+DELIVERY_DISTANCE_MODE = env.str('DELIVERY_DISTANCE_MODE', 'haversine')
+DELIVERY_RADIUS_KM = env.float('DELIVERY_RADIUS_KM', 50)
+RESTAURANT_INDEX_CELL_SIZE_KM = env.float('RESTAURANT_INDEX_CELL_SIZE_KM', 5)